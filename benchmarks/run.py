@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Benchmarks rendering of the GOV.UK base layout, pagination components and service settings
+using the demo project. No network access or downloaded GOV.UK components are needed.
+
+    python benchmarks/run.py                  # print timings
+    python benchmarks/run.py --compare        # fail if slower than the stored baseline
+    python benchmarks/run.py --save-baseline  # store timings as the new baseline
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+baseline_path = os.path.join(root_path, 'benchmarks', 'baseline.json')
+
+service_settings_conf = {
+    'name': 'Demo service',
+    'phase': 'alpha',
+    'header_link_view_name': 'demo:demo',
+    'header_links': [
+        {'name': 'Home', 'link': 'demo:demo', 'link_is_view_name': True},
+        {'name': 'Benchmark', 'link': 'benchmark', 'link_is_view_name': True},
+        {'name': 'GOV.UK', 'link': 'https://gov.uk/'},
+    ],
+    'footer_links': [
+        {'name': 'Home', 'link': 'demo:demo', 'link_is_view_name': True},
+        {'name': 'GOV.UK', 'link': 'https://gov.uk/'},
+    ],
+}
+page_counts = (1, 7, 100, 10000, 1000000)
+# minimum fractional increase allowed in sub-microsecond p50 timings, which vary more between runs
+sub_microsecond_tolerance = 1.0
+
+
+def setup_django():
+    if root_path not in sys.path:
+        sys.path.insert(0, root_path)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+def populate_database():
+    from govuk_template_base.models import Link, ServiceSettings
+
+    service_settings = ServiceSettings.objects.get(host=ServiceSettings.default_host)
+    service_settings.name = service_settings_conf['name']
+    service_settings.phase = service_settings_conf['phase']
+    service_settings.header_link_view_name = service_settings_conf['header_link_view_name']
+    service_settings.save()
+    for link_conf in service_settings_conf['header_links']:
+        service_settings.header_links.add(Link.objects.create(**link_conf))
+    for link_conf in service_settings_conf['footer_links']:
+        service_settings.footer_links.add(Link.objects.create(**link_conf))
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[int(round(fraction * (len(timings) - 1)))]
+
+
+def measure(func, iterations, setup=None):
+    """
+    Times `func` returning p50/p95 in milliseconds, then runs it once more
+    to count database queries, peak traced memory and memory blocks still allocated afterwards
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(min(iterations, 10)):
+        setup and setup()
+        func()
+
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            setup and setup()
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    setup and setup()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    net_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+    return {
+        'p50_ms': round(statistics.median(timings), 6),
+        'p95_ms': round(percentile(timings, 0.95), 6),
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+        'net_blocks': net_blocks,
+    }
+
+
+def page_benchmarks(iterations):
+    from django.test import Client, override_settings
+
+    from govuk_template_base.service_settings import service_settings_cache
+
+    client = Client()
+
+    def render_page():
+        response = client.get('/en-gb/benchmark/')
+        assert response.status_code == 200, response.status_code
+
+    with override_settings(GOVUK_SERVICE_SETTINGS=service_settings_conf):
+        yield 'page: settings dict', measure(render_page, iterations)
+    yield 'page: database, cold', measure(render_page, iterations, setup=service_settings_cache.clear)
+    yield 'page: database, warm', measure(render_page, iterations)
+
+
+def pagination_benchmarks(iterations):
+    from django.template import Context, Template
+
+    page_list_template = Template('{% load govuk_template_base %}{% page_list page page_count "q=search" %}')
+    pagination_template = Template('{% load govuk_template_base %}'
+                                   '{% pagination prev_url next_url prev_title=prev_title next_title=next_title %}')
+    for page_count in page_counts:
+        context = Context({'page': (page_count + 1) // 2, 'page_count': page_count})
+        yield 'page_list: %d pages' % page_count, measure(lambda: page_list_template.render(context), iterations)
+    for page in (1, 50, 100):
+        context = Context({
+            'prev_url': '?page=%d' % (page - 1) if page > 1 else None,
+            'next_url': '?page=%d' % (page + 1) if page < 100 else None,
+            'prev_title': 'Page %d' % (page - 1),
+            'next_title': 'Page %d' % (page + 1),
+        })
+        yield 'pagination: page %d of 100' % page, measure(lambda: pagination_template.render(context), iterations)
+
+
+def service_settings_benchmarks(iterations):
+    from django.test import override_settings
+
+    from govuk_template_base.service_settings import default_settings, service_settings_cache, static_service_settings
+
+    def load_default_settings():
+        static_service_settings.load()
+        return default_settings()
+
+    with override_settings(GOVUK_SERVICE_SETTINGS=service_settings_conf):
+        yield 'default_settings: settings dict, cold', measure(load_default_settings, iterations)
+        yield 'default_settings: settings dict, warm', measure(default_settings, iterations)
+    yield 'default_settings: database, cold', measure(default_settings, iterations, setup=service_settings_cache.clear)
+    yield 'default_settings: database, warm', measure(default_settings, iterations)
+
+
+def run_benchmarks(iterations):
+    setup_django()
+    populate_database()
+    results = {}
+    for benchmarks in (page_benchmarks, pagination_benchmarks, service_settings_benchmarks):
+        for name, result in benchmarks(iterations):
+            results[name] = result
+    return results
+
+
+def print_results(results, baseline=None, stream=sys.stdout):
+    columns = ('p50_ms', 'p95_ms', 'queries', 'peak_kib', 'net_blocks')
+    name_width = max(map(len, results)) + 2
+    header = 'benchmark'.ljust(name_width) + ''.join(column.rjust(12) for column in columns)
+    if baseline:
+        header += 'baseline p50'.rjust(16)
+    stream.write(header + '\n' + '-' * len(header) + '\n')
+    for name, result in results.items():
+        line = name.ljust(name_width) + ''.join(str(result[column]).rjust(12) for column in columns)
+        if baseline and name in baseline:
+            line += str(baseline[name]['p50_ms']).rjust(16)
+        stream.write(line + '\n')
+
+
+def find_regressions(results, baseline, tolerance):
+    for name, expected in baseline.items():
+        result = results.get(name)
+        if result is None:
+            yield '%s: benchmark is missing' % name
+            continue
+        if result['queries'] > expected['queries']:
+            yield '%s: %d queries, baseline was %d' % (name, result['queries'], expected['queries'])
+        p50_tolerance = max(tolerance, sub_microsecond_tolerance) if expected['p50_ms'] < 0.001 else tolerance
+        if result['p50_ms'] > expected['p50_ms'] * (1 + p50_tolerance):
+            yield '%s: p50 %.6fms, baseline was %.6fms' % (name, result['p50_ms'], expected['p50_ms'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks rendering using the demo project.')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed runs of each benchmark.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store results as the new baseline.')
+    parser.add_argument('--compare', action='store_true', help='Exit with an error if results regress from baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed fractional increase in p50 timings when comparing, '
+                             'at least %s for sub-microsecond timings.' % sub_microsecond_tolerance)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations)
+    baseline = None
+    if os.path.isfile(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Saved baseline to %s' % baseline_path)
+    elif args.compare:
+        if not baseline:
+            sys.exit('No baseline stored, use --save-baseline')
+        regressions = list(find_regressions(results, baseline, args.tolerance))
+        if regressions:
+            sys.exit('Regressions found:\n' + '\n'.join(regressions))
+        print('No regressions found')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEMO_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'demo')
+if DEMO_DIR not in sys.path:
+    sys.path.insert(0, DEMO_DIR)
+
+from settings import *  # noqa: E402,F401,F403
+from settings import TEMPLATES  # noqa: E402
+
+# production-like rendering with cached template loaders
+DEBUG = False
+TEMPLATES[0]['DIRS'] = [
+    # stand-in for `govuk_template.html` which `startgovukapp` would download
+    os.path.join(BENCHMARKS_DIR, 'templates'),
+    # the template that `startgovukapp` copies into the project as `[[app name]].html`
+    os.path.join(os.path.dirname(BENCHMARKS_DIR), 'govuk_template_base', 'management', 'commands',
+                 'govuk_template_base', 'templates'),
+]
+ROOT_URLCONF = 'benchmarks.urls'
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
@@ -0,0 +1,8 @@
+from django.conf.urls.i18n import i18n_patterns
+from django.urls import include, path
+from django.views.generic import TemplateView
+
+urlpatterns = i18n_patterns(
+    path('', include('demo_service.urls', namespace='demo')),
+    path('benchmark/', TemplateView.as_view(template_name='benchmark-page.html'), name='benchmark'),
+)
@@ -13,9 +13,8 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 User.objects.create_superuser(username='admin', email='admin@localhost', password='admin')
 
-from govuk_template_base.models import Link
-from govuk_template_base.service_settings import default_settings
-service_settings = default_settings()
+from govuk_template_base.models import Link, ServiceSettings
+service_settings = ServiceSettings.objects.get(host=ServiceSettings.default_host)
 service_settings.name = 'Demo service'
 service_settings.phase = 'alpha'
 service_settings.header_link_view_name = 'demo:demo'
@@ -1,10 +1,10 @@
-from django.conf.urls import include, url
 from django.conf.urls.i18n import i18n_patterns
 from django.contrib import admin
+from django.urls import include, path
 
 urlpatterns = [
-    url(r'^admin/', admin.site.urls),
-    url(r'^i18n/', include('django.conf.urls.i18n')),
+    path('admin/', admin.site.urls),
+    path('i18n/', include('django.conf.urls.i18n')),
 ] + i18n_patterns(
-    url(r'^', include('demo_service.urls', namespace='demo')),
+    path('', include('demo_service.urls', namespace='demo')),
 )
@@ -10,4 +10,12 @@ class LinkAdmin(admin.ModelAdmin):
 
 @admin.register(ServiceSettings)
 class ServiceSettingsAdmin(admin.ModelAdmin):
-    list_display = ('name', 'phase')
+    list_display = ('name', 'host', 'phase')
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None and obj.host == ServiceSettings.default_host:
+            return ('host',)
+        return ()
+
+    def has_delete_permission(self, request, obj=None):
+        return obj is not None and obj.host != ServiceSettings.default_host
@@ -1,7 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 from django.utils.translation import gettext_lazy as _
 
 
 class TemplateAppConfig(AppConfig):
     name = 'govuk_template_base'
     verbose_name = _('GOV.UK Base Template')
+
+    def ready(self):
+        from govuk_template_base.service_settings import (
+            create_database_settings, service_settings_cache, shared_service_settings_cache, static_service_settings,
+        )
+
+        static_service_settings.load()
+        shared_service_settings_cache.configure()
+        service_settings_cache.configure()
+        post_migrate.connect(create_database_settings, sender=self)
@@ -0,0 +1,220 @@
+import gzip
+import io
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import urlsplit
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.wsgi import get_path_info
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views import static
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+compressible_extensions = ('.css', '.js', '.svg')
+# encodings that can be served in order of preference and the extensions of their precompressed variants
+variant_extensions = (('br', '.br'), ('gzip', '.gz'))
+quality_pattern = re.compile(r';\s*q\s*=\s*([^;\s]*)')
+
+
+def gzip_compress(content):
+    # fixed modification time so that unchanged content compresses identically
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename='', mode='wb', fileobj=buffer, compresslevel=9, mtime=0) as f:
+        f.write(content)
+    return buffer.getvalue()
+
+
+def get_compressors():
+    compressors = [('.gz', gzip_compress)]
+    if brotli:
+        compressors.insert(0, ('.br', brotli.compress))
+    return compressors
+
+
+def is_compressible(path):
+    return path.lower().endswith(compressible_extensions)
+
+
+def is_fresh(variant_path, stat):
+    """
+    Variants are given their source file’s modification time so that stale ones can be recognised
+    """
+    try:
+        return os.stat(variant_path).st_mtime_ns == stat.st_mtime_ns
+    except OSError:
+        return False
+
+
+def compress_file(path):
+    """
+    Writes gzip, and brotli if available, variants next to a file unless they are up to date;
+    returns paths of variants written
+    """
+    stat = os.stat(path)
+    compressors = [
+        (extension, compress)
+        for extension, compress in get_compressors()
+        if not is_fresh(path + extension, stat)
+    ]
+    if not compressors:
+        return []
+    with open(path, 'rb') as f:
+        content = f.read()
+    written = []
+    for extension, compress in compressors:
+        variant_path = path + extension
+        compressed = compress(content)
+        if len(compressed) >= len(content):
+            if os.path.exists(variant_path):
+                os.remove(variant_path)
+            continue
+        with open(variant_path, 'wb') as f:
+            f.write(compressed)
+        os.utime(variant_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        written.append(variant_path)
+    return written
+
+
+def compress_files(paths):
+    written = []
+    for path in paths:
+        if is_compressible(path):
+            written.extend(compress_file(path))
+    return written
+
+
+def compress_directory(path):
+    paths = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        paths.extend(os.path.join(root, file_name) for file_name in sorted(files))
+    return compress_files(paths)
+
+
+def get_encoding_qualities(accept_encoding):
+    """
+    Returns the quality value of each encoding in an `Accept-Encoding` header;
+    invalid values are treated as refusals
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        encoding = item.split(';', 1)[0].strip().lower()
+        if not encoding:
+            continue
+        quality = quality_pattern.search(item)
+        try:
+            qualities[encoding] = float(quality.group(1)) if quality else 1.0
+        except ValueError:
+            qualities[encoding] = 0.0
+    return qualities
+
+
+def is_encoding_accepted(encoding, qualities):
+    # explicitly listed encodings take precedence over the wildcard
+    quality = qualities.get(encoding, qualities.get('*', 0.0))
+    return quality > 0
+
+
+def choose_variant(path, accept_encoding):
+    """
+    Returns the path of the up-to-date precompressed variant of a file preferred by the `Accept-Encoding` header
+    and its encoding, or the file itself and None
+    """
+    if not accept_encoding or not is_compressible(path):
+        return path, None
+    qualities = get_encoding_qualities(accept_encoding)
+    stat = None
+    for encoding, extension in variant_extensions:
+        if is_encoding_accepted(encoding, qualities):
+            stat = stat or os.stat(path)
+            if is_fresh(path + extension, stat):
+                return path + extension, encoding
+    return path, None
+
+
+def get_content_type(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+class PrecompressedStaticFilesHandler(StaticFilesHandler):
+    """
+    Serves static files found by finders like `StaticFilesHandler`, choosing precompressed variants
+    """
+
+    def serve(self, request):
+        path = posixpath.normpath(self.file_path(request.path)).lstrip('/')
+        absolute_path = finders.find(path)
+        if not absolute_path:
+            return super().serve(request)
+        variant_path, encoding = choose_variant(absolute_path, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        response = static.serve(request, os.path.basename(variant_path), document_root=os.path.dirname(variant_path))
+        if is_compressible(absolute_path):
+            patch_vary_headers(response, ['Accept-Encoding'])
+        if encoding and response.status_code == 200:
+            response['Content-Type'] = get_content_type(absolute_path)
+            response['Content-Encoding'] = encoding
+        return response
+
+
+class PrecompressedStaticFiles:
+    """
+    WSGI middleware serving collected static files, choosing precompressed variants;
+    other requests are passed to the wrapped application. Use in `wsgi.py`:
+
+        application = PrecompressedStaticFiles(get_wsgi_application())
+    """
+
+    def __init__(self, application, root=None, prefix=None, max_age=None):
+        self.application = application
+        self.root = os.path.abspath(root or settings.STATIC_ROOT)
+        self.prefix = prefix or urlsplit(settings.STATIC_URL).path
+        self.max_age = max_age
+
+    def find(self, path):
+        if not path.startswith(self.prefix):
+            return None
+        try:
+            file_path = safe_join(self.root, path[len(self.prefix):])
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if os.path.isfile(file_path):
+            return file_path
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        file_path = method in ('GET', 'HEAD') and self.find(get_path_info(environ))
+        if not file_path:
+            return self.application(environ, start_response)
+
+        variant_path, encoding = choose_variant(file_path, environ.get('HTTP_ACCEPT_ENCODING', ''))
+        stat = os.stat(variant_path)
+        headers = [('Last-Modified', http_date(stat.st_mtime))]
+        if is_compressible(file_path):
+            headers.append(('Vary', 'Accept-Encoding'))
+        if self.max_age is not None:
+            headers.append(('Cache-Control', 'max-age=%d, public' % self.max_age))
+        modified_since = parse_http_date_safe(environ.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if modified_since and int(stat.st_mtime) <= modified_since:
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.extend([('Content-Type', get_content_type(file_path)), ('Content-Length', str(stat.st_size))])
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(variant_path, 'rb'))
@@ -1,12 +1,25 @@
+import functools
+
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import get_language, gettext
 
+from govuk_template_base.service_settings import request_settings
+from govuk_template_base.translation import string_tables
 
-def govuk_template_base(_):
-    html_lang = get_language()
+
+def template_messages():
     return {
-        'html_lang': html_lang or settings.LANGUAGE_CODE,
         'skip_link_message': gettext('Skip to main content'),
         'logo_link_title': gettext('Go to the GOV.UK homepage'),
         'crown_copyright_message': gettext('© Crown copyright'),
     }
+
+
+def govuk_template_base(request):
+    html_lang = get_language()
+    return dict(
+        string_tables.get('template_messages', template_messages),
+        html_lang=html_lang or settings.LANGUAGE_CODE,
+        service_settings=SimpleLazyObject(functools.partial(request_settings, request)),
+    )
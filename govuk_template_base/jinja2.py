@@ -0,0 +1,113 @@
+"""
+Jinja2 environment with the same helpers as the `govuk_template_base` template tag library; use with:
+
+    TEMPLATES = [{
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'govuk_template_base.jinja2.environment',
+            'context_processors': ['govuk_template_base.context_processors.govuk_template_base'],
+        },
+    }]
+"""
+import jinja2
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _, ngettext
+from markupsafe import Markup
+
+from govuk_template_base.renderers import (
+    jinja2_template_path, keyset_page_list_template_name, packaged_templates, page_list_template_name,
+    page_list_without_count_template_name, pagination_template_name, render_page_list, render_pagination,
+)
+from govuk_template_base.templatetags import govuk_template_base as tags
+from govuk_template_base.timing import timed
+from govuk_template_base.translation import string_tables
+
+try:
+    pass_context = jinja2.pass_context
+except AttributeError:
+    # Jinja2 < 3.0
+    pass_context = jinja2.contextfunction
+
+
+def render_template(context, template_name, values):
+    return Markup(context.environment.get_template(template_name).render(values))
+
+
+def is_packaged(context, template_name):
+    return packaged_templates.is_packaged(context.environment, template_name, path=jinja2_template_path)
+
+
+def url(view_name, *args, **kwargs):
+    return reverse(view_name, args=args, kwargs=kwargs)
+
+
+@pass_context
+def get_service_settings(context):
+    return tags.get_service_settings(context)
+
+
+@pass_context
+@timed('govuk-components')
+def page_list(context, page, page_count, query_string=None, end_padding=1, page_padding=2):
+    values = tags.page_list_context(page, page_count, query_string, end_padding, page_padding)
+    if all(isinstance(value, int) for value in (page, page_count)) and is_packaged(context, page_list_template_name):
+        return Markup(render_page_list(autoescape=context.eval_ctx.autoescape, **values))
+    return render_template(context, page_list_template_name, values)
+
+
+@pass_context
+@timed('govuk-components')
+def page_list_without_count(context, page, has_next, approximate_page_count=None, query_string=None,
+                            end_padding=1, page_padding=2):
+    values = tags.page_list_without_count_context(page, has_next, approximate_page_count, query_string,
+                                                  end_padding, page_padding)
+    return render_template(context, page_list_without_count_template_name, values)
+
+
+@pass_context
+@timed('govuk-components')
+def pagination(context, prev_url, next_url, prev_title=None, next_title=None, prev=_('Previous'), next=_('Next')):
+    values = tags.pagination_context(prev_url, next_url, prev_title, next_title, prev, next)
+    if is_packaged(context, pagination_template_name):
+        return Markup(render_pagination(autoescape=context.eval_ctx.autoescape, **values))
+    return render_template(context, pagination_template_name, values)
+
+
+@pass_context
+@timed('govuk-components')
+def keyset_page_list(context, page, query_string=None):
+    values = tags.keyset_page_list_context(page, query_string)
+    return render_template(context, keyset_page_list_template_name, values)
+
+
+@pass_context
+def keyset_pagination(context, page, query_string=None, prev_title=None, next_title=None,
+                      prev=_('Previous'), next=_('Next')):
+    return pagination(context, page.previous_url(query_string), page.next_url(query_string),
+                      prev_title=prev_title, next_title=next_title, prev=prev, next=next)
+
+
+def environment(**options):
+    """
+    Creates a Jinja2 environment with Django’s translations (cached for each language) installed
+    for the i18n extension and global functions equivalent to the `govuk_template_base` template tags
+    """
+    extensions = list(options.pop('extensions', ()))
+    if 'jinja2.ext.i18n' not in extensions:
+        extensions.append('jinja2.ext.i18n')
+    env = jinja2.Environment(extensions=extensions, **options)
+    env.install_gettext_callables(string_tables.gettext, ngettext, newstyle=True)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'get_service_settings': get_service_settings,
+        'page_list': page_list,
+        'page_list_without_count': page_list_without_count,
+        'pagination': pagination,
+        'keyset_page_list': keyset_page_list,
+        'keyset_pagination': keyset_pagination,
+    })
+    env.filters['separate_thousands'] = tags.separate_thousands
+    return env
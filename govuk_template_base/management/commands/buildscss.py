@@ -1,17 +1,43 @@
+import json
 import os
-import textwrap
 
 from django.apps import apps
 from django.conf import settings
 from django.core.management import BaseCommand, CommandError
 
+from govuk_template_base.compression import compress_files
+from govuk_template_base.purge import get_purger
+from govuk_template_base.scss import (  # noqa: F401
+    build_scss, compile_scss, get_app_dest_path, get_app_source_path, get_manifest_storage, get_scss_builds,
+    scss_defaults_importer, update_staticfiles_manifest,
+)
+
+
+def display_path(path):
+    if path.startswith('importer:'):
+        return path
+    return os.path.relpath(path)
+
 
 class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('args', metavar='app_labels', nargs='*',
                             help='Limit SCSS building to these apps.')
         parser.add_argument('--collect', action='store_true',
-                            help='Save output CSS in collected static files location.')
+                            help='Save output CSS in collected static files location; if the static files '
+                                 'storage uses a manifest, also save content-hashed copies and update it.')
+        parser.add_argument('--force', action='store_true',
+                            help='Compile all SCSS files even if their sources have not changed.')
+        parser.add_argument('--jobs', type=int, default=1,
+                            help='Compile SCSS files in this many parallel processes; 0 uses all CPUs.')
+        parser.add_argument('--compress', action='store_true',
+                            help='Save gzip (and brotli if available) compressed copies of changed output CSS.')
+        parser.add_argument('--purge', action='store_true',
+                            help='Remove CSS rules with class names or ids not found in any templates.')
+        parser.add_argument('--profile', nargs='?', const='buildscss-profile.json', metavar='JSON_PATH',
+                            help='Compile all SCSS files recording compile time, imports and the bytes of output '
+                                 'from each source file; saves them to a JSON file (buildscss-profile.json by '
+                                 'default) and prints a summary.')
 
     def handle(self, *app_labels, **options):
         if app_labels:
@@ -23,31 +49,94 @@ class Command(BaseCommand):
             app_configs = apps.get_app_configs()
         verbosity = options['verbosity']
         collected_dest = options['collect'] and os.path.join(settings.STATIC_ROOT, 'stylesheets')
-        paths = (os.path.join(app_config.path, 'static-src', 'stylesheets') for app_config in app_configs)
+        # all apps can be imported from even when only building some
+        include_paths = map(get_app_source_path, apps.get_app_configs())
+        include_paths = list(filter(os.path.isdir, include_paths))
+        paths = map(get_app_source_path, app_configs)
         paths = list(filter(os.path.isdir, paths))
-        for source_path in paths:
-            dest_path = collected_dest or os.path.join(source_path, os.pardir, os.pardir, 'static', 'stylesheets')
-            if verbosity > 1:
+        source_dest_paths = [
+            (source_path, collected_dest or get_app_dest_path(source_path))
+            for source_path in paths
+        ]
+        if verbosity > 1:
+            for source_path, _ in source_dest_paths:
                 self.stdout.write('Compiling SCSS files in %s' % source_path)
-            compile_scss(source_path, dest_path, include_paths=paths)
+        jobs = options['jobs'] or os.cpu_count() or 1
+        purger = get_purger() if options['purge'] else None
+        scss_builds = get_scss_builds(source_dest_paths, include_paths=include_paths, purger=purger)
+        built, errors = build_scss(scss_builds, force=options['force'], jobs=jobs, profile=bool(options['profile']))
+        if options['profile']:
+            self.report_profile(scss_builds, options['profile'], verbosity)
+        manifest_storage = options['collect'] and get_manifest_storage()
+        hashed_names = update_staticfiles_manifest(scss_builds, built, manifest_storage) if manifest_storage else []
+        if options['compress']:
+            output_paths = [output_path for scss_build in scss_builds for output_path in scss_build.get_output_paths()]
+            output_paths.extend(manifest_storage.path(hashed_name) for hashed_name in hashed_names)
+            compressed = compress_files(output_paths)
+        else:
+            compressed = []
+        if purger and verbosity:
+            self.report_purged(scss_builds, built)
+        self.report(built, errors, verbosity, hashed_names, compressed)
 
+    def report_profile(self, scss_builds, json_path, verbosity, top_sources=5):
+        import sass
 
-def scss_defaults_importer(path):
-    if path == 'govuk_template_base/defaults':
-        static_url = getattr(settings, 'STATIC_URL', None) or '/static/'
-        if not static_url.endswith('/'):
-            static_url += '/'
-        return [(path, textwrap.dedent('''
-            // Image asset paths required by GOV.UK frontend toolkit functions
-            $path: '%(static_url)simages/';
-        ''' % dict(static_url=static_url)))]
+        profiles = [profile for scss_build in scss_builds for profile in scss_build.profiles.values()]
+        with open(json_path, 'w') as f:
+            json.dump({
+                'sass_version': sass.__version__,
+                'compile_time': sum(profile['compile_time'] for profile in profiles),
+                'output_size': sum(profile['output_size'] for profile in profiles),
+                'entry_points': profiles,
+            }, f, indent=2)
+        if not verbosity:
+            return
+        rows = [('Entry point', 'Time (ms)', 'Imports', 'Size (bytes)')] + [
+            (
+                display_path(profile['entry_point']), '%.1f' % (profile['compile_time'] * 1000),
+                str(profile['imports']), str(profile['output_size']),
+            )
+            for profile in profiles
+        ]
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        for row in rows:
+            self.stdout.write('  '.join(
+                [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            ))
+        for profile in profiles:
+            self.stdout.write('Largest sources of %s:' % display_path(profile['entry_point']))
+            for source, size in list(profile['source_sizes'].items())[:top_sources]:
+                self.stdout.write('  %10d  %s' % (size, display_path(source)))
+        self.stdout.write('Profile saved to %s' % json_path)
 
+    def report_purged(self, scss_builds, built):
+        total_sizes = [0, 0]
+        for scss_build in scss_builds:
+            for output_path in scss_build.get_output_paths():
+                sizes = scss_build.manifest.outputs[output_path].get('sizes')
+                if output_path not in built or not sizes:
+                    continue
+                self.stdout.write('Removed unused rules from %s: %s' % (output_path, self.format_sizes(sizes)))
+                total_sizes = [total + size for total, size in zip(total_sizes, sizes)]
+        if total_sizes[0]:
+            self.stdout.write('Removed unused rules in total: %s' % self.format_sizes(total_sizes))
 
-def compile_scss(source_path, dest_path, include_paths=(), output_style='compressed'):
-    try:
-        import sass
-    except ImportError:
-        raise CommandError('libsass is not available, try installing using [scss] extra')
-    sass.compile(dirname=(source_path, dest_path), include_paths=include_paths,
-                 output_style=output_style,
-                 importers=[(0, scss_defaults_importer)])
+    def format_sizes(self, sizes):
+        before, after = sizes
+        return '%d → %d bytes (%d%% smaller)' % (before, after, round(100 * (before - after) / before) if before else 0)
+
+    def report(self, built, errors, verbosity, hashed_names=(), compressed=()):
+        if verbosity > 1:
+            for output_path in built:
+                self.stdout.write('Compiled %s' % output_path)
+            for hashed_name in hashed_names:
+                self.stdout.write('Saved %s' % hashed_name)
+            for variant_path in compressed:
+                self.stdout.write('Compressed %s' % variant_path)
+            if not built and not errors:
+                self.stdout.write('No changes')
+        if errors:
+            for entry_path, error in sorted(errors.items()):
+                self.stderr.write('Error compiling %s\n%s' % (entry_path, error))
+            raise CommandError('%d SCSS file(s) could not be compiled' % len(errors))
@@ -1,12 +1,24 @@
+import json
 import os
+import queue
+import re
 import threading
+import time
 import warnings
+from urllib.parse import urlsplit
 
 from django.apps import apps
 from django.conf import settings
-from django.contrib.staticfiles.handlers import StaticFilesHandler
 from django.core.management import CommandError, call_command
 from django.core.management.commands.runserver import Command as RunserverCommand
+from django.http import HttpResponseBase
+from django.templatetags.static import static
+
+from govuk_template_base.compression import PrecompressedStaticFilesHandler
+from govuk_template_base.scss import (
+    get_app_dest_path, get_app_source_path, get_dependencies, get_import_file_names, scss_built, source_extensions,
+)
+
 try:
     from watchdog.events import FileSystemEventHandler
     from watchdog.observers import Observer
@@ -15,15 +27,156 @@ except ImportError:
 
 base_options = ('verbosity', 'settings', 'pythonpath', 'traceback', 'no_color')
 
+live_reload_path = '/__live-reload__'
+live_reload_script = '''<script>
+(function () {
+  var source = new EventSource(%s);
+  source.addEventListener('css', function (event) {
+    var paths = JSON.parse(event.data);
+    Array.prototype.forEach.call(document.querySelectorAll('link[rel~="stylesheet"]'), function (link) {
+      var url = new URL(link.href, location.href);
+      if (paths.indexOf(url.pathname) === -1) return;
+      url.searchParams.set('live-reload', Date.now());
+      var replacement = link.cloneNode();
+      replacement.href = url.href;
+      replacement.onload = function () { link.remove(); };
+      link.parentNode.insertBefore(replacement, link.nextSibling);
+    });
+  });
+})();
+</script>
+'''
+body_end_pattern = re.compile(rb'</body\s*>', re.I)
+
+
+class BuildWorker(threading.Thread):
+    """
+    Runs `buildscss` in the background for apps once no changes to them have been scheduled for `delay` seconds;
+    apps changed at about the same time are built together
+    """
+
+    def __init__(self, delay, build_options, stdout, stderr):
+        super().__init__(name='buildscss', daemon=True)
+        self.delay = delay
+        self.build_options = build_options
+        self.stdout = stdout
+        self.stderr = stderr
+        self.condition = threading.Condition()
+        self.due = {}
+
+    def schedule(self, app_labels):
+        with self.condition:
+            due = time.monotonic() + self.delay
+            for app_label in app_labels:
+                self.due[app_label] = due
+            self.condition.notify()
+
+    def get_due_app_labels(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                app_labels = sorted(app_label for app_label, due in self.due.items() if due <= now)
+                if app_labels:
+                    for app_label in app_labels:
+                        del self.due[app_label]
+                    return app_labels
+                self.condition.wait(min(self.due.values()) - now if self.due else None)
+
+    def run(self):
+        while True:
+            app_labels = self.get_due_app_labels()
+            if self.build_options['verbosity']:
+                self.stdout.write('Building SCSS in %s' % ', '.join(app_labels))
+            try:
+                call_command('buildscss', *app_labels, **self.build_options)
+            except Exception as e:
+                # keep serving and watching so that the next change can fix the error
+                self.stderr.write(str(e))
+
+
+class LiveReloadHandler:
+    """
+    Wraps a WSGI handler to stream the URL paths of rebuilt stylesheets to open pages as server-sent events;
+    a script injected into HTML responses replaces only matching `<link>` elements without reloading the page
+    """
+    heartbeat = 15
+
+    def __init__(self, application):
+        self.application = application
+        self.lock = threading.Lock()
+        self.listeners = set()
+
+    def publish(self, paths):
+        with self.lock:
+            for listener in self.listeners:
+                listener.put(paths)
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') == live_reload_path:
+            start_response('200 OK', [('Content-Type', 'text/event-stream'), ('Cache-Control', 'no-cache')])
+            return self.stream_events()
+
+        started = []
+
+        def deferred_start_response(status, headers, exc_info=None):
+            started[:] = [status, headers, exc_info]
+
+        response = self.application(environ, deferred_start_response)
+        status, headers, exc_info = started
+        if self.should_inject(response):
+            script = live_reload_script % json.dumps(environ.get('SCRIPT_NAME', '') + live_reload_path)
+            response.content = self.inject(response.content, script.encode(response.charset))
+            headers = [
+                (name, str(len(response.content)) if name.lower() == 'content-length' else value)
+                for name, value in headers
+            ]
+        start_response(status, headers, exc_info)
+        return response
+
+    def should_inject(self, response):
+        return (
+            isinstance(response, HttpResponseBase) and not response.streaming
+            and response.get('Content-Type', '').startswith('text/html')
+            and not response.has_header('Content-Encoding')
+        )
+
+    def inject(self, content, script):
+        body_ends = list(body_end_pattern.finditer(content))
+        if not body_ends:
+            return content
+        index = body_ends[-1].start()
+        return content[:index] + script + content[index:]
+
+    def stream_events(self):
+        listener = queue.Queue()
+        with self.lock:
+            self.listeners.add(listener)
+        try:
+            # comment lines keep the connection open and reveal when the client has gone away
+            yield b': connected\n\n'
+            while True:
+                try:
+                    paths = listener.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield b': heartbeat\n\n'
+                else:
+                    yield ('event: css\ndata: %s\n\n' % json.dumps(paths)).encode('utf-8')
+        finally:
+            with self.lock:
+                self.listeners.discard(listener)
+
 
 class Command(RunserverCommand, FileSystemEventHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.watched_apps = []
         self.build_delay = 1
-        self.build_timer = None
+        self.build_worker = None
         self.build_options = {}
         self.serve_static = False
+        self.app_source_paths = {}
+        self.live_reload = False
+        self.live_reload_handler = None
 
     def add_arguments(self, parser):
         super().add_arguments(parser)
@@ -32,9 +185,13 @@ class Command(RunserverCommand, FileSystemEventHandler):
             help='Watch source assets for changes and rebuild them.',
         )
         parser.add_argument(
-            '--build-delay', default=self.build_delay, type=int,
+            '--build-delay', default=self.build_delay, type=float,
             help='Time to delay rebuild (seconds).',
         )
+        parser.add_argument(
+            '--live-reload', action='store_true',
+            help='Replace rebuilt stylesheets in open pages without reloading them.',
+        )
 
     def handle(self, *args, **options):
         if not settings.DEBUG:
@@ -52,6 +209,7 @@ class Command(RunserverCommand, FileSystemEventHandler):
         self.serve_static = 'django.contrib.staticfiles' in (a.name for a in apps.get_app_configs())
         self.build_delay = options['build_delay']
         self.build_options = {option: options[option] for option in base_options}
+        self.live_reload = options['live_reload']
         if not Observer:
             warnings.warn('watchdog is not available, try installing using [watch] extra')
         elif not options['use_reloader'] or os.environ.get('RUN_MAIN'):  # try to only run one observer
@@ -59,36 +217,94 @@ class Command(RunserverCommand, FileSystemEventHandler):
         return super().handle(*args, **options)
 
     def setup_observer(self):
+        self.app_source_paths = {
+            app_config.label: os.path.abspath(get_app_source_path(app_config))
+            for app_config in apps.get_app_configs()
+        }
+        self.app_source_paths = {
+            app_label: source_path
+            for app_label, source_path in self.app_source_paths.items()
+            if os.path.isdir(source_path)
+        }
+        self.build_worker = BuildWorker(self.build_delay, self.build_options, self.stdout, self.stderr)
+        self.build_worker.start()
+
         observer = Observer()
-        watched_app_paths = (os.path.join(app_config.path, 'static-src', 'stylesheets')
-                             for app_config in self.watched_apps)
-        watched_app_paths = filter(os.path.isdir, watched_app_paths)
-        for watched_app_path in watched_app_paths:
-            observer.schedule(self, watched_app_path, recursive=True)
+        for app_config in self.watched_apps:
+            watched_app_path = self.app_source_paths.get(app_config.label)
+            if watched_app_path:
+                observer.schedule(self, watched_app_path, recursive=True)
         observer.daemon = True
         observer.start()
 
     def on_created(self, event):
-        self.schedule_build(event.src_path)
+        self.schedule_build(event.src_path, created=True)
 
     def on_modified(self, event):
         self.schedule_build(event.src_path)
 
-    def schedule_build(self, path):
-        if not path.lower().endswith('.scss'):
+    def on_deleted(self, event):
+        self.schedule_build(event.src_path)
+
+    def on_moved(self, event):
+        # editors often save by renaming a temporary file over the original
+        self.schedule_build(event.src_path)
+        self.schedule_build(event.dest_path, created=True)
+
+    def get_app_labels_to_build(self, path, created=False):
+        """
+        Returns labels of the app containing the path and of apps whose stylesheets were built from it;
+        all apps if a new file could be found by an `@import` that previously resolved elsewhere or not at all
+        """
+        app_labels = []
+        dependencies = set()
+        for app_label, source_path in self.app_source_paths.items():
+            dest_path = get_app_dest_path(source_path)
+            app_dependencies = get_dependencies(dest_path)
+            if path.startswith(source_path + os.sep) or path in app_dependencies:
+                app_labels.append(app_label)
+            dependencies.update(app_dependencies)
+        if created and path not in dependencies and any(
+            os.path.basename(path) in get_import_file_names(get_app_dest_path(source_path))
+            for source_path in self.app_source_paths.values()
+        ):
+            return list(self.app_source_paths)
+        return app_labels
+
+    def schedule_build(self, path, created=False):
+        if not path.lower().endswith(source_extensions):
+            return
+        app_labels = self.get_app_labels_to_build(os.path.abspath(path), created=created)
+        if not app_labels:
             return
         if self.build_options['verbosity']:
-            self.stdout.write('Scheduling `buildscss`')
-        if self.build_timer:
-            self.build_timer.cancel()
-        # TODO: only build apps with changed paths?
-        self.build_timer = threading.Timer(self.build_delay, call_command,
-                                           args=('buildscss',),
-                                           kwargs=self.build_options)
-        self.build_timer.start()
+            self.stdout.write('Scheduling `buildscss` for %s' % ', '.join(app_labels))
+        self.build_worker.schedule(app_labels)
+
+    def get_stylesheet_paths(self, output_paths):
+        """
+        Returns URL paths of built CSS files that are served from apps’ static directories
+        """
+        paths = []
+        for output_path in output_paths:
+            for source_path in self.app_source_paths.values():
+                dest_path = get_app_dest_path(source_path)
+                if output_path.startswith(dest_path + os.sep):
+                    static_path = os.path.relpath(output_path, os.path.dirname(dest_path))
+                    paths.append(urlsplit(static(static_path.replace(os.sep, '/'))).path)
+                    break
+        return paths
+
+    def publish_stylesheets(self, output_paths, **kwargs):
+        paths = self.get_stylesheet_paths(output_paths)
+        if paths and self.live_reload_handler:
+            self.live_reload_handler.publish(paths)
 
     def get_handler(self, *args, **options):
         handler = super().get_handler(*args, **options)
         if self.serve_static:
-            handler = StaticFilesHandler(handler)
+            handler = PrecompressedStaticFilesHandler(handler)
+        if self.live_reload:
+            handler = self.live_reload_handler = LiveReloadHandler(handler)
+            scss_built.connect(self.publish_stylesheets, weak=False, dispatch_uid='devserver-live-reload')
         return handler
@@ -1,6 +1,7 @@
 import json
 import os
 from pathlib import Path
+import re
 import shutil
 
 from django.conf import settings
@@ -12,6 +13,17 @@ govuk_elements_version = '3.1.3'
 govuk_frontend_toolkit_version = '8.1.0'
 
 
+def convert_to_jinja2(text):
+    """
+    Converts the simple Django template syntax used by `govuk_template` into Jinja2
+    """
+    text = re.sub(r'{%\s*load\s+[^%]*%}', '', text)
+    text = re.sub(r'{%\s*static\s+(\'[^\']*\'|"[^"]*")\s*%}', r'{{ static(\1) }}', text)
+    text = re.sub(r'\|default:(\'[^\']*\'|"[^"]*")', r'|default(\1)', text)
+    text = text.replace('{{ block.super }}', '{{ super() }}')
+    return text
+
+
 class Command(StartAppCommand):
     help = 'Creates an app that can be used as a basis for GOV.UK-styled apps ' \
            'in the current directory or optionally in the given directory.'
@@ -41,6 +53,10 @@ class Command(StartAppCommand):
                             help='Choose a specific GOV.UK frontend-toolkit version to download')
         parser.add_argument('--static-url', default=getattr(settings, 'STATIC_URL', '') or '/static/',
                             help='URL for static assets')
+        parser.add_argument('--jinja2', action='store_true',
+                            help='Create Jinja2 templates instead of Django templates')
+        parser.add_argument('--compress', action='store_true',
+                            help='Save gzip (and brotli if available) compressed copies of static assets')
 
     def copy_dir(self, src_dir: Path, dest_dir: Path, overwrite=True, ignore_paths=()):
         ignore_paths = set(src_dir / Path(path) for path in ignore_paths)
@@ -65,6 +81,8 @@ class Command(StartAppCommand):
         template_version = options.pop('govuk_template_version')
         elements_version = options.pop('govuk_elements_version')
         frontend_toolkit_version = options.pop('govuk_frontend_toolkit_version')
+        jinja2 = options.pop('jinja2')
+        compress = options.pop('compress')
 
         options['extensions'].append('scss')
         options['template'] = str(Path(__file__).parent / 'govuk_template_base')
@@ -72,7 +90,12 @@ class Command(StartAppCommand):
         self.paths_to_remove = []
 
         app_dir = Path(target) / app_name
-        templates_dir = app_dir / 'templates'
+        if jinja2:
+            templates_dir = app_dir / 'jinja2'
+            shutil.rmtree(str(app_dir / 'templates'))
+        else:
+            templates_dir = app_dir / 'templates'
+            shutil.rmtree(str(app_dir / 'jinja2'))
         # static assets all have absolute paths so cannot include app_name
         static_dir = app_dir / 'static'
         images_dir = static_dir / 'images'
@@ -84,15 +107,19 @@ class Command(StartAppCommand):
         for path in (scss_dir, images_dir, css_dir, js_dir):
             path.is_dir() or path.mkdir(parents=True)
 
-        self.load_govuk_template(template_version, static_dir, templates_dir)
+        self.load_govuk_template(template_version, static_dir, templates_dir, jinja2=jinja2)
         self.load_govuk_elements(elements_version, frontend_toolkit_version, scss_dir, js_dir)
         self.load_govuk_frontend_toolkit(frontend_toolkit_version, scss_dir, js_dir, images_dir)
 
         self.info_message('Add `%s` to INSTALLED_APPS' % options['name'])
         self.info_message('Add `govuk_template_base.context_processors.govuk_template_base` to '
                           'template context processors')
+        if jinja2:
+            self.info_message('Use `govuk_template_base.jinja2.environment` as the Jinja2 template environment')
 
         self.build_scss(scss_dir, css_dir)
+        if compress:
+            self.compress_static(static_dir)
 
         if self.paths_to_remove:
             self.debug_message('Cleaning up temporary files')
@@ -102,7 +129,7 @@ class Command(StartAppCommand):
                 else:
                     shutil.rmtree(path_to_remove)
 
-    def load_govuk_template(self, version, static_dir: Path, templates_dir: Path):
+    def load_govuk_template(self, version, static_dir: Path, templates_dir: Path, jinja2=False):
         self.info_message('Downloading `govuk_template` version %s' % version)
         archive = self.download(
             'https://github.com/alphagov/govuk_template/releases/download/v%s/django_govuk_template-%s.tgz' % (
@@ -113,13 +140,16 @@ class Command(StartAppCommand):
         self.copy_dir(temporary_folder / 'govuk_template' / 'static', static_dir)
         self.copy_dir(temporary_folder / 'govuk_template' / 'templates' / 'govuk_template', templates_dir)
 
-        self.fix_templates(templates_dir)
+        self.fix_templates(templates_dir, jinja2=jinja2)
 
-    def fix_templates(self, templates_dir: Path):
+    def fix_templates(self, templates_dir: Path, jinja2=False):
         for path in templates_dir.rglob('*.html'):
             with path.open('rt') as f:
                 text = f.read()
-            text = text.replace('{% load staticfiles %}', '{% load static %}')
+            if jinja2:
+                text = convert_to_jinja2(text)
+            else:
+                text = text.replace('{% load staticfiles %}', '{% load static %}')
             with path.open('wt') as f:
                 f.write(text)
 
@@ -175,8 +205,14 @@ class Command(StartAppCommand):
         self.copy_dir(temporary_folder / 'javascripts', js_dir)
         self.copy_dir(temporary_folder / 'images', images_dir)
 
+    def compress_static(self, static_dir: Path):
+        from govuk_template_base.compression import compress_directory
+
+        for variant_path in compress_directory(str(static_dir)):
+            self.debug_message('Compressed %s' % variant_path)
+
     def build_scss(self, scss_dir: Path, css_dir: Path):
-        from govuk_template_base.management.commands.buildscss import compile_scss
+        from govuk_template_base.scss import compile_scss
 
         try:
             compile_scss(str(scss_dir), str(css_dir))
@@ -0,0 +1,67 @@
+import contextlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from govuk_template_base.timing import timing_recorder
+from govuk_template_base.warmup import warm_up
+
+
+class ServerTimingMiddleware:
+    """
+    Records time spent and queries made by the GOV.UK template base while handling each request;
+    adds them to a `Server-Timing` response header and passes them to `GOVUK_TIMING_CALLBACK` if set
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.add_header = getattr(settings, 'GOVUK_SERVER_TIMING_HEADER', True)
+        callback = getattr(settings, 'GOVUK_TIMING_CALLBACK', None)
+        if isinstance(callback, str):
+            callback = import_string(callback)
+        self.callback = callback
+
+    def __call__(self, request):
+        timings = timing_recorder.start()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.count_query))
+                with timings.stage('total'):
+                    response = self.get_response(request)
+        finally:
+            timing_recorder.stop()
+
+        if self.add_header:
+            self.add_server_timing(response, timings)
+        if self.callback:
+            self.callback(request, response, timings)
+        return response
+
+    def add_server_timing(self, response, timings):
+        metrics = [
+            '%s;dur=%.3f;desc="%d %s"' % (
+                name, stage.duration * 1000, stage.queries, 'query' if stage.queries == 1 else 'queries',
+            )
+            for name, stage in timings.stages.items()
+        ]
+        if response.has_header('Server-Timing'):
+            metrics.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(metrics)
+
+
+class WarmUpMiddleware:
+    """
+    Warms up templates, service settings and translations when the WSGI/ASGI handler is created,
+    i.e. once all apps are ready and before gunicorn forks workers if it preloads the application;
+    it is not used to handle requests and only warms up once per process
+    """
+    warmed_up = False
+
+    def __init__(self, get_response):
+        if not WarmUpMiddleware.warmed_up:
+            WarmUpMiddleware.warmed_up = True
+            warm_up()
+        raise MiddlewareNotUsed
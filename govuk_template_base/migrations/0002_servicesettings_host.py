@@ -0,0 +1,34 @@
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def keep_latest_service_settings(apps, schema_editor):
+    # the most recently modified settings were the ones in use and become the default settings
+    ServiceSettings = apps.get_model('govuk_template_base', 'ServiceSettings')
+    service_settings = ServiceSettings.objects.order_by('-modified').first()
+    if service_settings:
+        ServiceSettings.objects.exclude(pk=service_settings.pk).delete()
+
+
+def reset_sequences(apps, schema_editor):
+    ServiceSettings = apps.get_model('govuk_template_base', 'ServiceSettings')
+    connection = schema_editor.connection
+    for sql in connection.ops.sequence_reset_sql(no_style(), [ServiceSettings]):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # deleting rows and then altering the table in one transaction fails in PostgreSQL with pending trigger events
+    atomic = False
+    dependencies = [
+        ('govuk_template_base', '0001_initial'),
+    ]
+    operations = [
+        migrations.RunPython(keep_latest_service_settings, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='servicesettings',
+            name='host',
+            field=models.CharField(blank=True, help_text='Domain name without port, leave blank for default settings', max_length=255, unique=True, verbose_name='Host'),
+        ),
+        migrations.RunPython(reset_sequences, migrations.RunPython.noop),
+    ]
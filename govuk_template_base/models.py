@@ -1,15 +1,37 @@
 from django.core.validators import URLValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from govuk_template_base.service_settings import BaseServiceLink, BaseServiceSettings, ServicePhase, view_name_validator
+from govuk_template_base.service_settings import (
+    BaseServiceLink, BaseServiceSettings, ServicePhase, service_settings_cache, view_name_validator,
+)
+
+
+class ServiceSettingsQuerySet(models.QuerySet):
+    def with_links(self):
+        """
+        Prefetches header and footer links in a stable order
+        """
+        links = Link.objects.order_by('modified', 'pk')
+        return self.prefetch_related(
+            models.Prefetch('header_links', queryset=links),
+            models.Prefetch('footer_links', queryset=links),
+        )
 
 
 class ServiceSettings(BaseServiceSettings, models.Model):
     """
-    Defines the service’s title, phase and header/footer links
+    Defines the service’s title, phase and header/footer links for a host;
+    the default instance has a blank host and is used when no other host matches
     """
+    default_host = ''
+
     modified = models.DateTimeField(auto_now=True)
+    host = models.CharField(verbose_name=_('Host'), max_length=255, blank=True, unique=True,
+                            help_text=_('Domain name without port, leave blank for default settings'))
     name = models.CharField(verbose_name=_('Name'), max_length=100)
     localise_name = models.BooleanField(verbose_name=_('Localise name'), default=BaseServiceSettings.localise_name)
     phase = models.CharField(verbose_name=_('Phase'), max_length=10,
@@ -19,23 +41,46 @@ class ServiceSettings(BaseServiceSettings, models.Model):
     header_links = models.ManyToManyField('Link', verbose_name=_('Header links'), blank=True, related_name='+')
     footer_links = models.ManyToManyField('Link', verbose_name=_('Footer links'), blank=True, related_name='+')
 
+    objects = ServiceSettingsQuerySet.as_manager()
+
     class Meta:
         ordering = ('-modified',)
         verbose_name = verbose_name_plural = _('Service settings')
 
+    def clean(self):
+        self.host = self.host.lower()
+
+    def get_prefetched_links(self, field_name):
+        try:
+            return self._prefetched_objects_cache[field_name]
+        except (AttributeError, KeyError):
+            return None
+
     @property
     def has_header_links(self):
-        return self.header_links.exists()
+        links = self.get_prefetched_links('header_links')
+        if links is None:
+            return self.header_links.exists()
+        return bool(links)
 
     def get_header_links(self):
-        yield from self.header_links.all()
+        links = self.get_prefetched_links('header_links')
+        if links is None:
+            links = self.header_links.all()
+        yield from links
 
     @property
     def has_footer_links(self):
-        return self.footer_links.exists()
+        links = self.get_prefetched_links('footer_links')
+        if links is None:
+            return self.footer_links.exists()
+        return bool(links)
 
     def get_footer_links(self):
-        yield from self.footer_links.all()
+        links = self.get_prefetched_links('footer_links')
+        if links is None:
+            links = self.footer_links.all()
+        yield from links
 
 
 class Link(BaseServiceLink, models.Model):
@@ -59,3 +104,29 @@ class Link(BaseServiceLink, models.Model):
             view_name_validator(self.link)
         else:
             URLValidator(schemes=('http', 'https'))(self.link)
+
+
+@receiver([post_save, post_delete], sender=ServiceSettings)
+def service_settings_changed(using=None, **kwargs):
+    # clearing before the transaction commits would let other processes cache the old settings again
+    transaction.on_commit(service_settings_cache.clear, using=using)
+
+
+@receiver(post_save, sender=Link)
+@receiver(pre_delete, sender=Link)
+def service_link_changed(instance, using=None, **kwargs):
+    # links do not change the settings’ timestamp so touch those showing the link to let other processes’ caches notice;
+    # before deletion because the link is then no longer related to any settings
+    service_settings = ServiceSettings.objects.using(using).filter(
+        models.Q(header_links=instance) | models.Q(footer_links=instance)
+    )
+    if service_settings.update(modified=timezone.now()):
+        transaction.on_commit(service_settings_cache.clear, using=using)
+
+
+@receiver(m2m_changed, sender=ServiceSettings.header_links.through)
+@receiver(m2m_changed, sender=ServiceSettings.footer_links.through)
+def service_settings_links_changed(instance, action, using=None, **kwargs):
+    if action.startswith('post_'):
+        ServiceSettings.objects.using(using).filter(pk=instance.pk).update(modified=timezone.now())
+        transaction.on_commit(service_settings_cache.clear, using=using)
@@ -0,0 +1,255 @@
+import datetime
+import json
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.http import urlencode
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # keep microseconds which DjangoJSONEncoder truncates
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorSerializer:
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=CursorEncoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by filtering on the ordering fields of the last object shown
+    rather than using OFFSET so that deep pages are as cheap as the first one.
+    Ordering fields must not be nullable and are followed by the primary key to make the order unique.
+    """
+    cursor_parameter = 'cursor'
+    salt = 'govuk_template_base.pagination'
+
+    def __init__(self, queryset, page_size, ordering=None):
+        self.queryset = queryset
+        self.page_size = page_size
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('pk', queryset.model._meta.pk.name) for field in ordering):
+            ordering.append('pk')
+        self.ordering = []
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field or field.lstrip('-').startswith('?'):
+                raise ValueError('Keyset pagination only supports ordering by fields on %s' % queryset.model.__name__)
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            model_field = queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name)
+            if model_field.null:
+                # NULL values cannot be compared so the next page could not be filtered
+                raise ValueError('Keyset pagination does not support ordering by nullable field %s' % name)
+            attname = 'pk' if name == 'pk' else model_field.attname
+            self.ordering.append((name, attname, descending))
+
+    def get_ordering(self, reverse=False):
+        return ['%s%s' % ('-' if descending != reverse else '', name) for name, _, descending in self.ordering]
+
+    def get_filter(self, values, reverse=False):
+        keyset_filter = Q()
+        for index, (name, _, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition = Q(**{'%s__%s' % (name, lookup): values[index]})
+            for (previous_name, _, _), value in zip(self.ordering[:index], values):
+                condition &= Q(**{previous_name: value})
+            keyset_filter |= condition
+        return keyset_filter
+
+    def get_values(self, obj):
+        return [getattr(obj, attname) for _, attname, _ in self.ordering]
+
+    def make_cursor(self, obj, number, reverse=False):
+        return signing.dumps({'k': self.get_values(obj), 'n': number, 'r': reverse},
+                             salt=self.salt, serializer=CursorSerializer, compress=True)
+
+    def load_cursor(self, cursor):
+        try:
+            cursor = signing.loads(cursor, salt=self.salt, serializer=CursorSerializer)
+            values, number, reverse = cursor['k'], int(cursor['n']), bool(cursor['r'])
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+        if len(values) != len(self.ordering):
+            return None
+        return values, number, reverse
+
+    def get_page(self, cursor=None):
+        """
+        Returns the page identified by an opaque cursor or the first page if it is missing or invalid
+        """
+        loaded_cursor = cursor and self.load_cursor(cursor)
+        if not loaded_cursor:
+            object_list = list(self.queryset.order_by(*self.get_ordering())[:self.page_size + 1])
+            has_next = len(object_list) > self.page_size
+            return KeysetPage(self, object_list[:self.page_size], 1, has_previous=False, has_next=has_next)
+
+        values, number, reverse = loaded_cursor
+        queryset = self.queryset.filter(self.get_filter(values, reverse=reverse))
+        object_list = list(queryset.order_by(*self.get_ordering(reverse=reverse))[:self.page_size + 1])
+        has_more = len(object_list) > self.page_size
+        object_list = object_list[:self.page_size]
+        if reverse:
+            object_list.reverse()
+            return KeysetPage(self, object_list, number, has_previous=has_more and number > 1, has_next=True,
+                              cursor=cursor)
+        return KeysetPage(self, object_list, number, has_previous=True, has_next=has_more, cursor=cursor)
+
+
+class KeysetPage:
+    """
+    A page of objects from `KeysetPaginator` with opaque cursors to neighbouring pages
+    """
+
+    def __init__(self, paginator, object_list, number, has_previous, has_next, cursor=''):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.number = number
+        self.cursor = cursor
+        self.has_previous = has_previous and bool(object_list)
+        self.has_next = has_next and bool(object_list)
+
+    def __repr__(self):
+        return '<Page %s>' % self.number
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        if self.number == 2:
+            return ''
+        return self.paginator.make_cursor(self.object_list[0], self.number - 1, reverse=True)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return self.paginator.make_cursor(self.object_list[-1], self.number + 1)
+
+    def get_url(self, cursor, query_string=None):
+        params = []
+        if query_string:
+            params.append(query_string)
+        if cursor:
+            params.append(urlencode({self.paginator.cursor_parameter: cursor}))
+        return '?' + '&'.join(params)
+
+    def first_url(self, query_string=None):
+        return self.get_url('', query_string)
+
+    def current_url(self, query_string=None):
+        return self.get_url(self.cursor, query_string)
+
+    def previous_url(self, query_string=None):
+        cursor = self.previous_cursor
+        if cursor is None:
+            return None
+        return self.get_url(cursor, query_string)
+
+    def next_url(self, query_string=None):
+        cursor = self.next_cursor
+        if cursor is None:
+            return None
+        return self.get_url(cursor, query_string)
+
+
+def approximate_count(queryset):
+    """
+    Returns the query planner’s estimated row count on PostgreSQL or None for other databases
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) %s' % sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CountFreePaginator:
+    """
+    Paginates a queryset without counting all objects by fetching one more object than fits on a page;
+    optionally estimates the number of pages using the query planner
+    """
+
+    def __init__(self, queryset, page_size, estimate_page_count=False):
+        self.queryset = queryset
+        self.page_size = page_size
+        self.estimate_page_count = estimate_page_count
+
+    def get_object_list(self, number):
+        offset = (number - 1) * self.page_size
+        return list(self.queryset[offset:offset + self.page_size + 1])
+
+    def get_page(self, number):
+        """
+        Returns the page with the given number, the first page if the number is invalid
+        or the last page if the number is beyond the end
+        """
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        object_list = self.get_object_list(number)
+        if not object_list and number > 1:
+            # counting is only needed for page numbers that do not exist
+            number = max(-(-self.queryset.count() // self.page_size), 1)
+            object_list = self.get_object_list(number)
+        has_next = len(object_list) > self.page_size
+        approximate_page_count = None
+        if has_next and self.estimate_page_count:
+            object_count = approximate_count(self.queryset)
+            if object_count is not None:
+                approximate_page_count = -(-object_count // self.page_size)
+        return CountFreePage(object_list[:self.page_size], number, has_next, approximate_page_count)
+
+
+class CountFreePage:
+    """
+    A page of objects from `CountFreePaginator`
+    """
+
+    def __init__(self, object_list, number, has_next, approximate_page_count=None):
+        self.object_list = object_list
+        self.number = number
+        self.has_next = has_next
+        self.has_previous = number > 1
+        self.approximate_page_count = approximate_page_count
+
+    def __repr__(self):
+        return '<Page %s>' % self.number
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def next_page_number(self):
+        return self.number + 1
@@ -0,0 +1,177 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.template import engines
+
+# classes added by JavaScript rather than appearing in templates
+default_allowlist = ('js-*',)
+token_pattern = re.compile(r'[\w-]+')
+selector_name_pattern = re.compile(r'[.#]((?:\\.|[\w-])+)')
+# attribute selectors and negations do not need matching elements to exist
+ignored_selector_pattern = re.compile(r'\[[^\]]*\]|:not\([^)]*\)')
+leading_pattern = re.compile(r'(?:\s+|/\*.*?\*/)+', re.S)
+conditional_at_rules = ('@media', '@supports', '@document', '@-moz-document', '@layer')
+
+
+def get_template_dirs():
+    """
+    Returns directories searched by template engines and all installed apps’ template directories
+    """
+    template_dirs = []
+    for backend in engines.all():
+        template_dirs.extend(backend.template_dirs)
+    for app_config in apps.get_app_configs():
+        template_dirs.append(os.path.join(app_config.path, 'templates'))
+        template_dirs.append(os.path.join(app_config.path, 'jinja2'))
+    template_dirs = map(os.path.abspath, map(str, template_dirs))
+    return sorted(set(filter(os.path.isdir, template_dirs)))
+
+
+def get_used_names(template_dirs):
+    """
+    Returns every word in templates; this over-estimates the class names and ids in use
+    but also finds those in template variables and tags
+    """
+    names = set()
+    for template_dir in template_dirs:
+        for root, dirs, files in os.walk(template_dir):
+            for file_name in files:
+                with open(os.path.join(root, file_name), encoding='utf-8', errors='replace') as f:
+                    names.update(token_pattern.findall(f.read()))
+    return names
+
+
+def find_end(css, index, stops):
+    """
+    Returns the index of the first of `stops` characters not within a string, comment or brackets
+    """
+    depth = 0
+    length = len(css)
+    while index < length:
+        char = css[index]
+        if char in '"\'':
+            index += 1
+            while index < length and css[index] != char:
+                index += 2 if css[index] == '\\' else 1
+        elif css.startswith('/*', index):
+            end = css.find('*/', index + 2)
+            index = length if end == -1 else end + 1
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth <= 0 and char in stops:
+            return index
+        index += 1
+    return length
+
+
+def find_block_end(css, index):
+    depth = 0
+    while True:
+        index = find_end(css, index, '{}')
+        if index >= len(css) or (css[index] == '}' and depth == 0):
+            return index
+        depth += 1 if css[index] == '{' else -1
+        index += 1
+
+
+def parse_rules(css, index=0):
+    """
+    Returns CSS rules up to the end of the enclosing block as tuples of prelude and body, where the body is
+    a list of rules for conditional group at-rules, text for other blocks or None for statements and comments
+    """
+    rules = []
+    length = len(css)
+    while True:
+        match = leading_pattern.match(css, index)
+        if match:
+            rules.append((match.group(), None))
+            index = match.end()
+        start = index
+        index = find_end(css, index, '{};')
+        if index >= length or css[index] == '}':
+            if css[start:index]:
+                rules.append((css[start:index], None))
+            return rules, index
+        prelude = css[start:index]
+        if css[index] == ';':
+            rules.append((prelude + ';', None))
+            index += 1
+        elif prelude.lower().startswith(conditional_at_rules):
+            body, index = parse_rules(css, index + 1)
+            rules.append((prelude, body))
+            index += 1
+        else:
+            end = find_block_end(css, index + 1)
+            rules.append((prelude, css[index + 1:end]))
+            index = end + 1
+
+
+def split_selectors(prelude):
+    selectors = []
+    index = 0
+    while index <= len(prelude):
+        end = find_end(prelude, index, ',')
+        selectors.append(prelude[index:end])
+        index = end + 1
+    return selectors
+
+
+class CssPurger:
+    """
+    Removes CSS rules with selectors that refer to class names or ids not in use;
+    names ending with a hyphen are treated as prefixes as templates may be completing them
+    """
+
+    def __init__(self, used_names, allowlist=default_allowlist):
+        self.used_names = frozenset(used_names)
+        self.prefixes = tuple(sorted(name for name in self.used_names if name.endswith('-')))
+        self.allowlist = tuple(allowlist)
+        self.fingerprint = hashlib.sha1(json.dumps([sorted(self.used_names), self.allowlist]).encode()).hexdigest()
+
+    def is_used(self, name):
+        return (
+            name in self.used_names
+            or name.startswith(self.prefixes)
+            or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.allowlist)
+        )
+
+    def is_selector_used(self, selector):
+        selector = ignored_selector_pattern.sub('', selector)
+        return all(self.is_used(name.replace('\\', '')) for name in selector_name_pattern.findall(selector))
+
+    def purge_rules(self, rules):
+        parts = []
+        for prelude, body in rules:
+            if body is None:
+                parts.append(prelude)
+            elif isinstance(body, list):
+                body = self.purge_rules(body)
+                if leading_pattern.sub('', body):
+                    parts.append('%s{%s}' % (prelude, body))
+            elif prelude.startswith('@'):
+                parts.append('%s{%s}' % (prelude, body))
+            else:
+                selectors = split_selectors(prelude)
+                used_selectors = list(filter(self.is_selector_used, selectors))
+                if used_selectors:
+                    parts.append('%s{%s}' % (','.join(used_selectors), body))
+        return ''.join(parts)
+
+    def purge(self, css):
+        rules, _ = parse_rules(css)
+        return self.purge_rules(rules)
+
+
+def get_purger():
+    """
+    Creates a purger keeping names used in templates and those in the `GOVUK_PURGE_CSS_ALLOWLIST` setting
+    """
+    allowlist = getattr(settings, 'GOVUK_PURGE_CSS_ALLOWLIST', default_allowlist)
+    return CssPurger(get_used_names(get_template_dirs()), allowlist=allowlist)
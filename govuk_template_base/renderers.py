@@ -0,0 +1,154 @@
+import os
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.utils.formats import localize
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import gettext
+
+from govuk_template_base.translation import string_tables
+
+page_list_template_name = 'govuk_template_base/page-list.html'
+page_list_without_count_template_name = 'govuk_template_base/page-list-without-count.html'
+keyset_page_list_template_name = 'govuk_template_base/keyset-page-list.html'
+pagination_template_name = 'govuk_template_base/pagination.html'
+template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+jinja2_template_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jinja2')
+
+
+class PackagedTemplates:
+    """
+    Tracks whether template engines load this package’s own templates
+    or whether they have been overridden in a project
+    """
+
+    def __init__(self):
+        self.engines = {}
+
+    def clear(self, **kwargs):
+        self.engines = {}
+
+    def is_packaged(self, engine, template_name, path=template_path):
+        key = (id(engine), template_name)
+        try:
+            return self.engines[key]
+        except KeyError:
+            try:
+                template = engine.get_template(template_name)
+                # Jinja2 templates have no origin
+                origin_name = template.origin.name if hasattr(template, 'origin') else template.filename
+            except (TemplateDoesNotExist, LookupError):
+                # Jinja2’s TemplateNotFound is a LookupError
+                origin_name = None
+            is_packaged = origin_name == os.path.join(path, template_name)
+            self.engines[key] = is_packaged
+            return is_packaged
+
+
+packaged_templates = PackagedTemplates()
+
+
+@receiver(setting_changed)
+def clear_packaged_templates(setting, **kwargs):
+    if setting == 'TEMPLATES':
+        packaged_templates.clear()
+
+
+class ValueRenderer:
+    """
+    Renders values in the same way as `{{ value }}` in a template
+    """
+
+    def __init__(self, autoescape, use_l10n):
+        self.autoescape = autoescape
+        self.use_l10n = use_l10n
+
+    def __call__(self, value):
+        value = localize(value, use_l10n=self.use_l10n)
+        if self.autoescape:
+            return conditional_escape(str(value))
+        return str(value)
+
+
+def render_page_list(page, page_count, page_range, query_string, autoescape=True, use_l10n=None):
+    """
+    Renders the same HTML as `govuk_template_base/page-list.html`; memoised for each language
+    """
+    key = (page, page_count, tuple(page_range), query_string, hasattr(query_string, '__html__'),
+           autoescape, use_l10n)
+    rendered = string_tables.get('page_list_html', dict)
+    try:
+        return rendered[key]
+    except KeyError:
+        pass
+
+    render_value = ValueRenderer(autoescape, use_l10n)
+    page_label = render_value(gettext('Page'))
+    parts = ['\n\n\n\n']
+    if page_count > 1:
+        link_prefix = '?%s&amp;page=' % render_value(query_string) if query_string else '?page='
+        parts.append('  <ul class="govuk-page-list"><li>%s</li>' % page_label)
+        for page_index in page_range:
+            if not page_index:
+                parts.append('<li>\n          \n            …\n          \n        </li>')
+                continue
+            parts.append('<li><a href="%s%s" %s>' % (
+                link_prefix, render_value(page_index),
+                'class="govuk-page-list__current-page"' if page == page_index else '',
+            ))
+            if page_index != 1:
+                parts.append('<span class="visually-hidden">%s </span>' % page_label)
+            parts.append('<span>%s</span></a></li>' % render_value('{:,}'.format(page_index)))
+        parts.append('</ul>\n\n')
+    parts.append('\n<p class="govuk-page-list__description">\n  %s\n</p>\n' % (
+        gettext('Page %(page)s of %(page_count)s.') % {
+            'page': render_value(page),
+            'page_count': render_value(page_count),
+        }
+    ))
+
+    html = mark_safe(''.join(parts))
+    if len(rendered) >= 1024:
+        rendered.clear()
+    rendered[key] = html
+    return html
+
+
+def render_pagination(prev, next, prev_page=None, next_page=None, autoescape=True, use_l10n=None):
+    """
+    Renders the same HTML as `govuk_template_base/pagination.html`
+    """
+    render_value = ValueRenderer(autoescape, use_l10n)
+
+    def render_link(link, direction, rel, title, label):
+        return (
+            '\n      <li class="%(direction)s">\n'
+            '        <a title="%(title)s" rel="%(rel)s" href="%(url)s">\n'
+            '          <span class="govuk-pagination__label">%(label)s</span>\n'
+            '          %(part_title)s\n'
+            '        </a>\n'
+            '      </li>\n    '
+        ) % {
+            'direction': direction,
+            'title': render_value(title),
+            'rel': rel,
+            'url': render_value(link['url']),
+            'label': render_value(label),
+            'part_title': (
+                '\n            <span class="govuk-pagination__part-title">%s</span>\n          ' %
+                render_value(link['title'])
+            ) if link['title'] else '',
+        }
+
+    return mark_safe(
+        '\n\n<nav class="govuk-pagination print-hidden" role="navigation" aria-label="%s">\n  <ul class="group">\n    '
+        '%s\n\n    %s\n  </ul>\n</nav>\n' % (
+            render_value(gettext('Pagination')),
+            render_link(prev_page, 'previous', 'prev', gettext('Navigate to previous page'), prev)
+            if prev_page else '',
+            render_link(next_page, 'next', 'next', gettext('Navigate to next page'), next)
+            if next_page else '',
+        )
+    )
@@ -0,0 +1,519 @@
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+import textwrap
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.core.management import CommandError
+from django.dispatch import Signal
+
+source_extensions = ('.scss', '.sass')
+comment_pattern = re.compile(r'/\*.*?\*/|//[^\n]*', re.S)
+import_pattern = re.compile(r'@import\s+([^;\n]+)')
+string_pattern = re.compile(r'(["\'])(.*?)\1')
+base64_digits = {digit: value for value, digit in enumerate(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+)}
+
+# sent with `output_paths` of CSS files written whenever any are built
+scss_built = Signal()
+
+
+def get_app_source_path(app_config):
+    return os.path.join(app_config.path, 'static-src', 'stylesheets')
+
+
+def get_app_dest_path(source_path):
+    return os.path.normpath(os.path.join(source_path, os.pardir, os.pardir, 'static', 'stylesheets'))
+
+
+def get_manifest_dir():
+    """
+    Directory for build manifests, which must not be served as they contain source paths;
+    `GOVUK_BUILDSCSS_CACHE_DIR` setting or a user cache directory by default
+    """
+    manifest_dir = getattr(settings, 'GOVUK_BUILDSCSS_CACHE_DIR', None)
+    if not manifest_dir:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        manifest_dir = os.path.join(cache_home, 'govuk_template_base', 'buildscss')
+    return manifest_dir
+
+
+def get_manifest_path(dest_path):
+    """
+    Returns the path of the build manifest for a destination directory
+    """
+    dest_path = os.path.abspath(dest_path)
+    file_name = '%s-%s.json' % (os.path.basename(dest_path), content_hash(dest_path)[:16])
+    return os.path.join(get_manifest_dir(), file_name)
+
+
+def get_static_url():
+    return getattr(settings, 'STATIC_URL', None) or '/static/'
+
+
+def scss_defaults_importer(path, prev=None, static_url=None):
+    if path == 'govuk_template_base/defaults':
+        static_url = static_url or get_static_url()
+        if not static_url.endswith('/'):
+            static_url += '/'
+        return [(path, textwrap.dedent('''
+            // Image asset paths required by GOV.UK frontend toolkit functions
+            $path: '%(static_url)simages/';
+        ''' % dict(static_url=static_url)))]
+
+
+def get_importers(static_url):
+    return [(0, functools.partial(scss_defaults_importer, static_url=static_url))]
+
+
+def content_hash(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def parse_imports(source):
+    """
+    Returns names imported by an SCSS/Sass source, ignoring plain CSS imports
+    """
+    source = comment_pattern.sub('', source)
+    names = []
+    for statement in import_pattern.findall(source):
+        for _, name in string_pattern.findall(statement):
+            if name.endswith('.css') or name.startswith(('http://', 'https://', '//')) or 'url(' in statement:
+                continue
+            names.append(name)
+    return names
+
+
+def import_candidates(name):
+    directory, base_name = os.path.split(name)
+    if base_name.endswith(source_extensions):
+        return [name, os.path.join(directory, '_' + base_name)]
+    candidates = []
+    for extension in source_extensions + ('.css',):
+        candidates.append(name + extension)
+        candidates.append(os.path.join(directory, '_' + base_name + extension))
+    for extension in source_extensions:
+        candidates.append(os.path.join(name, '_index' + extension))
+        candidates.append(os.path.join(name, 'index' + extension))
+    return candidates
+
+
+class Manifest:
+    """
+    Records content hashes and imports of source files, keyed on their modification time and size
+    so that unchanged files need not be read, and the inputs that each output CSS file was built from
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get('files', {})
+        self.outputs = data.get('outputs', {})
+
+    def save(self):
+        if not self.outputs and not self.files and not os.path.exists(self.path):
+            # there are no entry points
+            return
+        self.files = {path: record for path, record in self.files.items() if os.path.exists(path)}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'files': self.files, 'outputs': self.outputs}, f, indent=1, sort_keys=True)
+
+    def get_file(self, path):
+        """
+        Returns the content hash and imported names of a source file, or None if it does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.files.pop(path, None)
+            return None
+        record = self.files.get(path)
+        if record and record['mtime'] == stat.st_mtime_ns and record['size'] == stat.st_size:
+            return record
+        with open(path, 'rb') as f:
+            content = f.read()
+        record = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'hash': content_hash(content),
+            'imports': parse_imports(content.decode('utf-8', 'replace')),
+        }
+        self.files[path] = record
+        return record
+
+
+class ScssBuild:
+    """
+    Compiles SCSS entry points in a source directory into CSS in a destination directory,
+    skipping entry points whose transitive `@import` inputs are unchanged since the last build
+    """
+
+    def __init__(self, source_path, dest_path, include_paths=(), output_style='compressed', manifest=None,
+                 purger=None):
+        self.source_path = os.path.abspath(source_path)
+        self.dest_path = os.path.abspath(dest_path)
+        self.include_paths = [os.path.abspath(path) for path in include_paths]
+        self.output_style = output_style
+        self.static_url = get_static_url()
+        self.importers = get_importers(self.static_url)
+        self.manifest = manifest or Manifest(get_manifest_path(self.dest_path))
+        self.purger = purger
+        self.profiles = collections.OrderedDict()
+
+    def get_entry_points(self):
+        """
+        Yields source files compiled to CSS, i.e. those that are not partials,
+        along with their output paths relative to the destination directory
+        """
+        for root, dirs, files in os.walk(self.source_path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if file_name.startswith('_') or not file_name.endswith(source_extensions):
+                    continue
+                path = os.path.join(root, file_name)
+                yield path, os.path.splitext(os.path.relpath(path, self.source_path))[0] + '.css'
+
+    def resolve_import(self, name, importing_path):
+        """
+        Returns the key identifying an imported file in the dependency graph:
+        an importer’s name, a file path or, if it cannot be found, the name prefixed by `missing:`
+        """
+        for _, importer in self.importers:
+            if importer(name):
+                return 'importer:%s' % name
+        search_paths = [os.path.dirname(importing_path)] + self.include_paths
+        for search_path in search_paths:
+            for candidate in import_candidates(name):
+                path = os.path.join(search_path, candidate)
+                if os.path.isfile(path):
+                    return os.path.normpath(path)
+        return 'missing:%s' % name
+
+    def get_importer_hash(self, key):
+        name = key[len('importer:'):]
+        for _, importer in self.importers:
+            result = importer(name)
+            if result:
+                return content_hash(json.dumps(result))
+
+    def get_inputs(self, entry_path):
+        """
+        Returns content hashes of all files an entry point transitively imports, including itself
+        """
+        inputs = {}
+        pending = [entry_path]
+        while pending:
+            key = pending.pop()
+            if key in inputs:
+                continue
+            if key.startswith('importer:'):
+                inputs[key] = self.get_importer_hash(key)
+                continue
+            if key.startswith('missing:'):
+                inputs[key] = None
+                continue
+            record = self.manifest.get_file(key)
+            inputs[key] = record and record['hash']
+            if record:
+                pending.extend(self.resolve_import(name, key) for name in record['imports'])
+        return inputs
+
+    def get_fingerprint(self, inputs):
+        import sass
+
+        options = [self.output_style, self.include_paths, sass.__version__]
+        if self.purger:
+            options.append(self.purger.fingerprint)
+        return content_hash(json.dumps([options, sorted(inputs.items())]))
+
+    def needs_building(self, output_path, fingerprint):
+        output = self.manifest.outputs.get(output_path)
+        return not output or output['fingerprint'] != fingerprint or not os.path.isfile(output_path)
+
+    def plan(self, force=False):
+        """
+        Returns entry points that need compiling as tuples of entry path, output path and fingerprint;
+        forgets outputs of entry points that no longer exist
+        """
+        planned = []
+        entry_outputs = set()
+        for entry_path, output_name in self.get_entry_points():
+            output_path = os.path.join(self.dest_path, output_name)
+            entry_outputs.add(output_path)
+            fingerprint = self.get_fingerprint(self.get_inputs(entry_path))
+            if force or self.needs_building(output_path, fingerprint):
+                planned.append((entry_path, output_path, fingerprint))
+        for output_path, output in list(self.manifest.outputs.items()):
+            if output['source'] == self.source_path and output_path not in entry_outputs:
+                del self.manifest.outputs[output_path]
+        return planned
+
+    def get_output_paths(self):
+        return sorted(
+            output_path
+            for output_path, output in self.manifest.outputs.items()
+            if output['source'] == self.source_path
+        )
+
+    def record(self, output_path, fingerprint, sizes=None):
+        output = {'source': self.source_path, 'fingerprint': fingerprint}
+        if sizes:
+            output['sizes'] = sizes
+        self.manifest.outputs[output_path] = output
+
+    def record_profile(self, entry_path, output_path, result):
+        imports = sorted(key for key in self.get_inputs(entry_path) if key != entry_path)
+        source_sizes = sorted(result['source_sizes'].items(), key=lambda item: (-item[1], item[0]))
+        self.profiles[entry_path] = collections.OrderedDict([
+            ('entry_point', entry_path),
+            ('output', output_path),
+            ('compile_time', result['compile_time']),
+            ('output_size', result['output_size']),
+            ('imports', len(imports)),
+            ('include_paths', [
+                include_path
+                for include_path in self.include_paths
+                if any(key.startswith(include_path + os.sep) for key in imports)
+            ]),
+            ('source_sizes', collections.OrderedDict(source_sizes)),
+        ])
+
+    def save(self):
+        self.manifest.save()
+
+
+def decode_vlq(segment):
+    values = []
+    value = shift = 0
+    for digit in segment:
+        digit = base64_digits[digit]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            values.append(-(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    return values
+
+
+def get_source_sizes(css, source_map, map_path):
+    """
+    Returns the number of bytes of CSS generated from each source file according to a source map;
+    sources provided by importers rather than files are named like their dependency graph keys
+    """
+    source_map = json.loads(source_map)
+    map_dir = os.path.dirname(map_path)
+    sources = []
+    for source in source_map['sources']:
+        path = os.path.normpath(os.path.join(map_dir, source))
+        sources.append(path if os.path.exists(path) else 'importer:%s' % source.lstrip('./'))
+    source_sizes = collections.defaultdict(int)
+    source_index = 0
+    for line, line_mappings in zip(css.split('\n'), source_map['mappings'].split(';')):
+        column = 0
+        segments = []
+        for segment in filter(None, line_mappings.split(',')):
+            values = decode_vlq(segment)
+            column += values[0]
+            if len(values) > 1:
+                source_index += values[1]
+                segments.append((column, sources[source_index]))
+        for (start, source), (end, _) in zip(segments, segments[1:] + [(len(line), None)]):
+            source_sizes[source] += len(line[start:end].encode('utf-8'))
+    return dict(source_sizes)
+
+
+def compile_entry_point(entry_path, output_path, include_paths, output_style, static_url, purger=None,
+                        profile=False):
+    """
+    Compiles one SCSS file into CSS, removing unused rules if given a purger; returns the sizes
+    of the CSS before and after purging and, if profiling, the compile time, output size and bytes
+    generated from each source file. A module-level function so that it can run in a process pool
+    """
+    import sass
+
+    options = dict(filename=entry_path, include_paths=include_paths,
+                   output_style=output_style, importers=get_importers(static_url))
+    result = {}
+    start = time.perf_counter()
+    if profile:
+        # the source map is only used to attribute output to sources, not saved
+        map_path = output_path + '.map'
+        css, source_map = sass.compile(source_map_filename=map_path, omit_source_map_url=True, **options)
+        result['compile_time'] = time.perf_counter() - start
+        result['source_sizes'] = get_source_sizes(css, source_map, map_path)
+    else:
+        css = sass.compile(**options)
+    if purger:
+        purged_css = purger.purge(css)
+        result['sizes'] = [len(css.encode('utf-8')), len(purged_css.encode('utf-8'))]
+        css = purged_css
+    result['output_size'] = len(css.encode('utf-8'))
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(css)
+    return result
+
+
+def get_dependencies(dest_path):
+    """
+    Returns the source files that CSS in a destination directory was last built from
+    """
+    return set(Manifest(get_manifest_path(dest_path)).files)
+
+
+def get_import_file_names(dest_path):
+    """
+    Returns the file names that `@import` statements in sources of CSS in a destination directory could refer to
+    """
+    return {
+        os.path.basename(candidate)
+        for record in Manifest(get_manifest_path(dest_path)).files.values()
+        for name in record['imports']
+        for candidate in import_candidates(name)
+    }
+
+
+def get_scss_builds(source_dest_paths, include_paths=(), output_style='compressed', purger=None):
+    """
+    Creates builds for pairs of source and destination directories;
+    builds into the same destination share its manifest
+    """
+    manifests = {}
+    scss_builds = []
+    for source_path, dest_path in source_dest_paths:
+        dest_path = os.path.abspath(dest_path)
+        if dest_path not in manifests:
+            manifests[dest_path] = Manifest(get_manifest_path(dest_path))
+        scss_builds.append(ScssBuild(source_path, dest_path, include_paths=include_paths,
+                                     output_style=output_style, manifest=manifests[dest_path], purger=purger))
+    return scss_builds
+
+
+def compile_entry_points(arguments, jobs=1):
+    """
+    Calls `compile_entry_point` with each set of arguments, using a pool of `jobs` processes if more than one;
+    returns the result of each call and the exception it raised or None if it succeeded
+    """
+    import sass
+
+    if jobs > 1 and len(arguments) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(arguments))) as executor:
+            futures = [executor.submit(compile_entry_point, *entry_arguments) for entry_arguments in arguments]
+            return [
+                (None, future.exception()) if future.exception() else (future.result(), None)
+                for future in futures
+            ]
+
+    results = []
+    for entry_arguments in arguments:
+        try:
+            results.append((compile_entry_point(*entry_arguments), None))
+        except sass.CompileError as e:
+            results.append((None, e))
+    return results
+
+
+def build_scss(scss_builds, force=False, jobs=1, profile=False):
+    """
+    Compiles entry points whose inputs changed, or all of them if profiling, using a pool of `jobs` processes
+    if more than one; returns paths of CSS files written and a dictionary of compilation errors keyed on
+    entry point path. Profiles are saved in each build’s `profiles`
+    """
+    try:
+        import sass
+    except ImportError:
+        raise CommandError('libsass is not available, try installing using [scss] extra')
+
+    tasks = [
+        (scss_build, entry_path, output_path, fingerprint)
+        for scss_build in scss_builds
+        for entry_path, output_path, fingerprint in scss_build.plan(force or profile)
+    ]
+
+    results = compile_entry_points([
+        (entry_path, output_path, scss_build.include_paths, scss_build.output_style, scss_build.static_url,
+         scss_build.purger, profile)
+        for scss_build, entry_path, output_path, _ in tasks
+    ], jobs)
+
+    built = []
+    errors = {}
+    for (scss_build, entry_path, output_path, fingerprint), (result, error) in zip(tasks, results):
+        if error is None:
+            scss_build.record(output_path, fingerprint, result.get('sizes'))
+            if profile:
+                scss_build.record_profile(entry_path, output_path, result)
+            built.append(output_path)
+        elif isinstance(error, sass.CompileError):
+            errors[entry_path] = str(error)
+        else:
+            raise error
+    for scss_build in scss_builds:
+        scss_build.save()
+    if built:
+        scss_built.send(sender=ScssBuild, output_paths=built)
+    return built, errors
+
+
+def get_manifest_storage():
+    """
+    Returns the static files storage if it saves a manifest of content-hashed names, e.g. `ManifestStaticFilesStorage`
+    """
+    if isinstance(staticfiles_storage, ManifestFilesMixin):
+        return staticfiles_storage
+
+
+def update_staticfiles_manifest(scss_builds, built, storage):
+    """
+    Saves copies of CSS files built into the storage’s location with content-hashed names
+    and records them in its manifest, as collectstatic would; CSS that was not rebuilt is only hashed
+    if it is missing from the manifest. Returns the hashed names saved
+    """
+    hashed_files = storage.load_manifest()
+    if isinstance(hashed_files, tuple):
+        # Django 4.2+ also returns the manifest’s hash
+        hashed_files = hashed_files[0]
+    storage.hashed_files = hashed_files
+    location = os.path.abspath(storage.location)
+    saved = []
+    for scss_build in scss_builds:
+        for output_path in scss_build.get_output_paths():
+            if not output_path.startswith(location + os.sep):
+                continue
+            name = os.path.relpath(output_path, location).replace(os.sep, '/')
+            key = storage.hash_key(name)
+            hashed_name = storage.hashed_files.get(key)
+            if output_path not in built and hashed_name and storage.exists(hashed_name):
+                continue
+            hashed_name = storage.hashed_name(name)
+            hashed_path = storage.path(hashed_name)
+            if not os.path.exists(hashed_path):
+                shutil.copyfile(output_path, hashed_path)
+            storage.hashed_files[key] = hashed_name
+            saved.append(hashed_name)
+    if saved:
+        storage.save_manifest()
+    return saved
+
+
+def compile_scss(source_path, dest_path, include_paths=(), output_style='compressed', force=False):
+    built, errors = build_scss(get_scss_builds([(source_path, dest_path)], include_paths, output_style), force)
+    if errors:
+        raise CommandError('\n'.join(errors.values()))
+    return built
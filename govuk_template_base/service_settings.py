@@ -1,9 +1,18 @@
 import enum
+import threading
+import time
+import uuid
 
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.urls import reverse, NoReverseMatch
-from django.utils.translation import gettext, gettext_lazy as _, pgettext_lazy
+from django.core.exceptions import DisallowedHost, FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http.request import split_domain_port
+from django.urls import get_script_prefix, get_urlconf, reverse, NoReverseMatch
+from django.utils.translation import get_language, gettext_lazy as _, pgettext_lazy
+
+from govuk_template_base.timing import timed
+from govuk_template_base.translation import string_tables
 
 
 def view_name_validator(view_name):
@@ -13,6 +22,38 @@ def view_name_validator(view_name):
         raise ValidationError(_('View not found'), code='no_reverse_match')
 
 
+class ReverseCache:
+    """
+    Memoises reversed link view names; keyed on URLconf, script prefix and language
+    because all of them can change the resulting URL
+    """
+
+    def __init__(self):
+        self.urls = {}
+
+    def clear(self, **kwargs):
+        self.urls.clear()
+
+    @timed('govuk-reverse')
+    def reverse(self, view_name):
+        key = (view_name, get_urlconf(), get_script_prefix(), get_language())
+        try:
+            return self.urls[key]
+        except KeyError:
+            url = reverse(view_name)
+            self.urls[key] = url
+            return url
+
+
+reverse_cache = ReverseCache()
+
+
+@receiver(setting_changed)
+def clear_reverse_cache(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        reverse_cache.clear()
+
+
 class ServicePhase(enum.Enum):
     discovery = pgettext_lazy('Service phase', 'Discovery')
     alpha = pgettext_lazy('Service phase', 'Alpha')
@@ -23,6 +64,10 @@ class ServicePhase(enum.Enum):
     def model_choices(cls):
         return tuple((item.name, item.value) for item in cls)
 
+    @classmethod
+    def names(cls):
+        return {item.name: str(item.value) for item in cls}
+
 
 class BaseServiceSettings:
     """
@@ -40,22 +85,29 @@ class BaseServiceSettings:
 
     @property
     def localised_name(self):
-        return gettext(self.name) if self.localise_name else self.name
+        return string_tables.gettext(self.name) if self.localise_name else self.name
 
     @property
     def phase_name(self):
-        return ServicePhase[self.phase].value
+        return string_tables.get('phase_names', ServicePhase.names)[self.phase]
 
     @property
     def header_link_url(self):
         if self.header_link_view_name:
-            return reverse(self.header_link_view_name)
+            return reverse_cache.reverse(self.header_link_view_name)
         return self.header_link_view_name
 
     @property
     def has_header_links(self):
         return bool(self.header_links)
 
+    @property
+    def active_view_names(self):
+        """
+        View names of header links which can be marked as active
+        """
+        return frozenset(link.link for link in self.get_header_links() if link.link_is_view_name)
+
     def get_header_links(self):
         return self.header_links
 
@@ -81,33 +133,393 @@ class BaseServiceLink:
 
     @property
     def localised_name(self):
-        return gettext(self.name) if self.localise_name else self.name
+        return string_tables.gettext(self.name) if self.localise_name else self.name
 
     @property
     def url(self):
         if self.link_is_view_name:
-            return reverse(self.link)
+            return reverse_cache.reverse(self.link)
         return self.link
 
 
-def default_settings():
-    conf = getattr(settings, 'GOVUK_SERVICE_SETTINGS', {})
-    if conf:
-        link_keys = {'header_links', 'footer_links'}
-        service_settings = BaseServiceSettings()
-        for settings_key, settings_value in conf.items():
-            if settings_key in link_keys:
-                links = []
-                for link_conf in settings_value:
-                    link = BaseServiceLink()
-                    for link_key, link_value in link_conf.items():
-                        setattr(link, link_key, link_value)
-                    links.append(link)
-                setattr(service_settings, settings_key, links)
-            else:
-                setattr(service_settings, settings_key, settings_value)
-        return service_settings
+class FrozenMixin:
+    __slots__ = ()
+
+    def __init__(self, **attrs):
+        for attr, value in attrs.items():
+            object.__setattr__(self, attr, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is immutable' % type(self).__name__)
+
+
+class FrozenServiceLink(FrozenMixin, BaseServiceLink):
+    """
+    Immutable header/footer link compiled from the `GOVUK_SERVICE_SETTINGS` setting
+    """
+    __slots__ = ('name', 'localise_name', 'link', 'link_is_view_name')
+
+
+class FrozenServiceSettings(FrozenMixin, BaseServiceSettings):
+    """
+    Immutable service settings compiled from the `GOVUK_SERVICE_SETTINGS` setting
+    with link presence and active view names precomputed
+    """
+    __slots__ = ('name', 'localise_name', 'phase', 'header_link_view_name', 'header_links', 'footer_links',
+                 'has_header_links', 'has_footer_links', 'active_view_names')
+
+
+def compile_link(link_conf):
+    unknown_keys = set(link_conf) - set(FrozenServiceLink.__slots__)
+    if unknown_keys:
+        raise ImproperlyConfigured('Unknown GOVUK_SERVICE_SETTINGS link keys: %s' % ', '.join(sorted(unknown_keys)))
+    attrs = {attr: getattr(BaseServiceLink, attr) for attr in FrozenServiceLink.__slots__}
+    attrs.update(link_conf)
+    return FrozenServiceLink(**attrs)
 
+
+def compile_settings(conf):
+    link_keys = {'header_links', 'footer_links'}
+    settings_keys = {'name', 'localise_name', 'phase', 'header_link_view_name'} | link_keys
+    unknown_keys = set(conf) - settings_keys
+    if unknown_keys:
+        raise ImproperlyConfigured('Unknown GOVUK_SERVICE_SETTINGS keys: %s' % ', '.join(sorted(unknown_keys)))
+    attrs = {attr: getattr(BaseServiceSettings, attr) for attr in settings_keys}
+    attrs.update(conf)
+    if attrs['phase'] not in ServicePhase.__members__:
+        raise ImproperlyConfigured('Unknown GOVUK_SERVICE_SETTINGS phase “%s”, choose from: %s' % (
+            attrs['phase'], ', '.join(ServicePhase.__members__)
+        ))
+    for settings_key in link_keys:
+        attrs[settings_key] = tuple(map(compile_link, attrs[settings_key]))
+    return FrozenServiceSettings(
+        has_header_links=bool(attrs['header_links']),
+        has_footer_links=bool(attrs['footer_links']),
+        active_view_names=frozenset(link.link for link in attrs['header_links'] if link.link_is_view_name),
+        **attrs
+    )
+
+
+class SettingsVersion:
+    """
+    Incremented whenever service settings objects are replaced in this process
+    so that anything derived from them can be invalidated
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def bump(self):
+        with self.lock:
+            self.value += 1
+
+
+settings_version = SettingsVersion()
+
+
+class StaticServiceSettings:
+    """
+    Holds service settings compiled from the `GOVUK_SERVICE_SETTINGS` setting, if it is defined
+    """
+
+    def __init__(self):
+        self.service_settings = None
+
+    def load(self):
+        conf = getattr(settings, 'GOVUK_SERVICE_SETTINGS', None)
+        self.service_settings = compile_settings(conf) if conf else None
+        settings_version.bump()
+
+
+static_service_settings = StaticServiceSettings()
+
+
+@receiver(setting_changed)
+def reload_static_settings(setting, **kwargs):
+    if setting == 'GOVUK_SERVICE_SETTINGS':
+        static_service_settings.load()
+
+
+def settings_conf(service_settings):
+    """
+    Serialises service settings into the same structure as the `GOVUK_SERVICE_SETTINGS` setting
+    """
+    def links_conf(links):
+        return [
+            {
+                'name': link.name,
+                'localise_name': link.localise_name,
+                'link': link.link,
+                'link_is_view_name': link.link_is_view_name,
+            }
+            for link in links
+        ]
+
+    return {
+        'name': service_settings.name,
+        'localise_name': service_settings.localise_name,
+        'phase': service_settings.phase,
+        'header_link_view_name': service_settings.header_link_view_name,
+        'header_links': links_conf(service_settings.get_header_links()),
+        'footer_links': links_conf(service_settings.get_footer_links()),
+    }
+
+
+def freeze_settings(host_settings):
+    """
+    Compiles service settings for each host into immutable objects
+    """
+    return {host: compile_settings(settings_conf(service_settings)) for host, service_settings in host_settings.items()}
+
+
+class SharedServiceSettingsCache:
+    """
+    Shares serialised service settings for all hosts between processes using the Django cache named by
+    the `GOVUK_SERVICE_SETTINGS_CACHE` setting. The snapshot is tagged with a version that is replaced
+    whenever settings are saved; stale snapshots continue to be served while one process rebuilds it.
+    Settings are read by `configure` when the app is ready and whenever they change.
+    """
+    key_prefix = 'govuk_template_base:service_settings'
+    lock_timeout = 30
+
+    def __init__(self):
+        self.snapshot_key = self.key_prefix
+        self.version_key = self.key_prefix + ':version'
+        self.lock_key = self.key_prefix + ':lock'
+        self.snapshots = {}
+        self.alias = None
+        self.ttl = 60
+
+    def configure(self):
+        self.alias = getattr(settings, 'GOVUK_SERVICE_SETTINGS_CACHE', None)
+        self.ttl = getattr(settings, 'GOVUK_SERVICE_SETTINGS_CACHE_TTL', 60)
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+    def bump_version(self):
+        self.cache.set(self.version_key, uuid.uuid4().hex, None)
+
+    def get_version(self, cache=None, version=None):
+        """
+        Returns the current version tag, creating one if none exists
+        """
+        cache = cache or self.cache
+        version = version or cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def get(self):
+        """
+        Returns service settings for all hosts and the version tag of the snapshot they came from,
+        which is older than the current one when a stale snapshot is served
+        """
+        cache = self.cache
+        values = cache.get_many([self.version_key, self.snapshot_key])
+        version = self.get_version(cache, values.get(self.version_key))
+        snapshot = values.get(self.snapshot_key)
+        if snapshot and snapshot['version'] == version and time.time() < snapshot['fresh_until']:
+            return self.deserialise(snapshot), version
+        if cache.add(self.lock_key, True, self.lock_timeout):
+            try:
+                snapshot = {
+                    'version': version,
+                    'fresh_until': time.time() + self.ttl,
+                    'conf': {
+                        host: settings_conf(service_settings)
+                        for host, service_settings in load_database_settings().items()
+                    },
+                }
+                cache.set(self.snapshot_key, snapshot, None)
+            finally:
+                cache.delete(self.lock_key)
+        elif not snapshot:
+            # another process is rebuilding and there is nothing stale to serve
+            return freeze_settings(load_database_settings()), version
+        return self.deserialise(snapshot), snapshot['version']
+
+    def deserialise(self, snapshot):
+        key = (snapshot['version'], snapshot['fresh_until'])
+        try:
+            return self.snapshots[key]
+        except KeyError:
+            host_settings = {host: compile_settings(conf) for host, conf in snapshot['conf'].items()}
+            self.snapshots = {key: host_settings}
+            return host_settings
+
+
+shared_service_settings_cache = SharedServiceSettingsCache()
+
+
+def load_database_settings():
+    """
+    Returns service settings for all hosts keyed by host name; the default settings have a blank host
+    """
     from govuk_template_base.models import ServiceSettings
 
-    return ServiceSettings.objects.first() or ServiceSettings.objects.create(name=BaseServiceSettings.name)
+    host_settings = {
+        service_settings.host: service_settings
+        for service_settings in ServiceSettings.objects.with_links().order_by()
+    }
+    if ServiceSettings.default_host not in host_settings:
+        # normally created by `post_migrate` signal handler; an unsaved model instance cannot load its links
+        host_settings[ServiceSettings.default_host] = compile_settings({})
+    return host_settings
+
+
+def create_database_settings(using, apps=None, **kwargs):
+    """
+    Creates the default service settings row after migrations are run;
+    `flush` sends the signal without historical models
+    """
+    from django.apps import apps as global_apps
+    from django.db import router
+
+    apps = apps or global_apps
+
+    try:
+        ServiceSettings = apps.get_model('govuk_template_base', 'ServiceSettings')
+        # absent if migrations were only partly applied
+        ServiceSettings._meta.get_field('host')
+    except (LookupError, FieldDoesNotExist):
+        return
+    if not router.allow_migrate_model(using, ServiceSettings):
+        return
+    from govuk_template_base.models import ServiceSettings as ConcreteServiceSettings
+
+    # the primary key is left to the database so that sequences advance
+    ServiceSettings.objects.using(using).get_or_create(
+        host=ConcreteServiceSettings.default_host,
+        defaults={'name': BaseServiceSettings.name},
+    )
+
+
+class ServiceSettingsCache:
+    """
+    Process-local cache of the service settings for all hosts stored in the database along with
+    their header/footer links; cleared by model signals and revalidated against the `modified` timestamps
+    once the TTL expires so that changes made in other processes are eventually seen.
+    If `GOVUK_SERVICE_SETTINGS_CACHE` is set, settings are instead loaded from the shared cache once the TTL expires
+    or as soon as its version tag differs from that of the snapshot last loaded, which is checked on every lookup.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.host_settings = None
+        self.timestamps = None
+        self.expires = 0
+        self.shared_version = None
+        self.ttl = 60
+
+    def configure(self):
+        self.ttl = getattr(settings, 'GOVUK_SERVICE_SETTINGS_CACHE_TTL', 60)
+
+    def clear(self, **kwargs):
+        with self.lock:
+            self.generation += 1
+            self.host_settings = None
+            self.expires = 0
+        settings_version.bump()
+        string_tables.clear()
+        if shared_service_settings_cache.alias:
+            shared_service_settings_cache.bump_version()
+
+    def get(self, host=''):
+        host_settings = self.get_host_settings()
+        return host_settings.get(host) or host_settings['']
+
+    def get_host_settings(self):
+        host_settings = self.host_settings
+        shared_version = shared_service_settings_cache.get_version() if shared_service_settings_cache.alias else None
+        if host_settings is not None and time.monotonic() < self.expires and shared_version == self.shared_version:
+            return host_settings
+
+        with self.lock:
+            generation = self.generation
+            timestamps = self.timestamps
+        if host_settings is None or not self.is_current(timestamps):
+            # a stale shared snapshot is tagged with an older version so that it is replaced on the next lookup
+            host_settings, timestamps, shared_version = self.load()
+        with self.lock:
+            if generation == self.generation:
+                if host_settings is not self.host_settings:
+                    settings_version.bump()
+                self.host_settings = host_settings
+                self.timestamps = timestamps
+                self.expires = time.monotonic() + self.ttl
+                self.shared_version = shared_version
+        return host_settings
+
+    def is_current(self, timestamps):
+        from govuk_template_base.models import ServiceSettings
+
+        if timestamps is None:
+            return False
+        return dict(ServiceSettings.objects.order_by().values_list('pk', 'modified')) == timestamps
+
+    def load(self):
+        """
+        Returns immutable settings for all hosts so that callers cannot change what other requests see,
+        along with the `modified` timestamps of the rows they were loaded from or the shared snapshot’s version tag
+        """
+        if shared_service_settings_cache.alias:
+            host_settings, shared_version = shared_service_settings_cache.get()
+            return host_settings, None, shared_version
+        database_settings = load_database_settings()
+        host_settings = freeze_settings(database_settings)
+        timestamps = {
+            service_settings.pk: service_settings.modified
+            for service_settings in database_settings.values()
+            if hasattr(service_settings, 'pk')
+        }
+        return host_settings, timestamps, None
+
+
+service_settings_cache = ServiceSettingsCache()
+
+
+@receiver(setting_changed)
+def configure_service_settings_caches(setting, **kwargs):
+    if setting in ('GOVUK_SERVICE_SETTINGS_CACHE', 'GOVUK_SERVICE_SETTINGS_CACHE_TTL'):
+        shared_service_settings_cache.configure()
+        service_settings_cache.configure()
+
+
+@timed('govuk-settings')
+def default_settings(host=''):
+    """
+    Returns service settings for the host, falling back to the default settings
+    """
+    if static_service_settings.service_settings is not None:
+        return static_service_settings.service_settings
+    return service_settings_cache.get(host)
+
+
+def request_host(request):
+    try:
+        host = request.get_host()
+    except DisallowedHost:
+        return ''
+    return split_domain_port(host)[0]
+
+
+@timed('govuk-settings')
+def request_settings(request):
+    """
+    Returns service settings for the request’s host, loading them at most once per request
+    """
+    try:
+        return request._govuk_service_settings
+    except AttributeError:
+        request._govuk_service_settings = default_settings(request_host(request))
+        return request._govuk_service_settings
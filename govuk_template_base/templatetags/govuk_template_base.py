@@ -1,9 +1,14 @@
-import itertools
-
 from django import template
-from django.utils.translation import gettext_lazy as _
+from django.conf import settings
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language, gettext_lazy as _
 
-from govuk_template_base.service_settings import default_settings
+from govuk_template_base.renderers import (
+    keyset_page_list_template_name, packaged_templates, page_list_template_name,
+    page_list_without_count_template_name, pagination_template_name, render_page_list, render_pagination,
+)
+from govuk_template_base.service_settings import default_settings, request_settings, settings_version
+from govuk_template_base.timing import timed
 
 register = template.Library()
 
@@ -15,28 +20,126 @@ def separate_thousands(value):
     return '{:,}'.format(value)
 
 
-register.simple_tag(name='get_service_settings')(default_settings)
+@register.simple_tag(takes_context=True)
+def get_service_settings(context):
+    request = context.get('request')
+    if request is None:
+        return default_settings()
+    return request_settings(request)
+
+
+class FragmentCache:
+    """
+    Holds rendered HTML fragments until service settings change
+    """
+
+    def __init__(self):
+        self.version = None
+        self.fragments = {}
+
+    @property
+    def enabled(self):
+        # opt-in because overridden blocks inside cached fragments may contain per-user content
+        return getattr(settings, 'GOVUK_CACHE_TEMPLATE_FRAGMENTS', False)
+
+    def get(self, key, render):
+        if self.version != settings_version.value:
+            self.version = settings_version.value
+            self.fragments = {}
+        fragments = self.fragments
+        try:
+            return fragments[key]
+        except KeyError:
+            html = render()
+            fragments[key] = html
+            return html
+
+
+fragment_cache = FragmentCache()
+
+
+class CachedFragmentNode(template.Node):
+    """
+    Renders contents once per template, language, service settings and, optionally, active header link;
+    contents must not depend on anything else in the context
+    """
+
+    def __init__(self, name, nodelist, vary_on_view_name=False):
+        self.name = name
+        self.nodelist = nodelist
+        self.vary_on_view_name = vary_on_view_name
+
+    @timed('govuk-components')
+    def render(self, context):
+        template_name = context.template and context.template.name
+        if not template_name or not fragment_cache.enabled:
+            return self.nodelist.render(context)
+        service_settings = get_service_settings(context)
+        view_name = None
+        if self.vary_on_view_name:
+            resolver_match = getattr(context.get('request'), 'resolver_match', None)
+            view_name = resolver_match and resolver_match.view_name
+            if view_name not in service_settings.active_view_names:
+                view_name = None
+        key = (self.name, template_name, get_language(), id(service_settings), view_name)
+        return fragment_cache.get(key, lambda: mark_safe(self.nodelist.render(context)))
+
+
+def parse_cached_fragment(parser, token, vary_on_view_name=False):
+    name = token.split_contents()[0]
+    nodelist = parser.parse(('end%s' % name,))
+    parser.delete_first_token()
+    return CachedFragmentNode(name, nodelist, vary_on_view_name=vary_on_view_name)
+
+
+@register.tag
+def govuk_header(parser, token):
+    return parse_cached_fragment(parser, token, vary_on_view_name=True)
+
+
+@register.tag
+def govuk_phase_banner(parser, token):
+    return parse_cached_fragment(parser, token)
+
+
+@register.tag
+def govuk_footer_links(parser, token):
+    return parse_cached_fragment(parser, token)
+
+
+def with_ellipses(page_ranges, page_count):
+    """
+    Merges ranges of page numbers, inserting None where pages are skipped
+    """
+    pages_with_ellipses = []
+    last_page = 0
+    for page_range in sorted(page_ranges, key=lambda page_range: page_range.start):
+        for index in range(max(page_range.start, last_page + 1, 1), min(page_range.stop, page_count + 1)):
+            if last_page + 1 < index:
+                pages_with_ellipses.append(None)
+            pages_with_ellipses.append(index)
+            last_page = index
+    return pages_with_ellipses
+
+
+def render_inclusion(context, template_name, values):
+    template = context.template.engine.get_template(template_name)
+    new_context = context.new(values)
+    csrf_token = context.get('csrf_token')
+    if csrf_token is not None:
+        new_context['csrf_token'] = csrf_token
+    return template.render(new_context)
 
 
-@register.inclusion_tag('govuk_template_base/page-list.html')
-def page_list(page, page_count, query_string=None, end_padding=1, page_padding=2):
+def page_list_context(page, page_count, query_string=None, end_padding=1, page_padding=2):
     if page_count < 7:
         pages_with_ellipses = range(1, page_count + 1)
     else:
-        pages = sorted(set(itertools.chain(
+        pages_with_ellipses = with_ellipses((
             range(1, end_padding + 2),
             range(page - page_padding, page + page_padding + 1),
             range(page_count - end_padding, page_count + 1),
-        )))
-        pages_with_ellipses = []
-        last_page = 0
-        for index in pages:
-            if index < 1 or index > page_count:
-                continue
-            if last_page + 1 < index:
-                pages_with_ellipses.append(None)
-            pages_with_ellipses.append(index)
-            last_page = index
+        ), page_count)
     return {
         'page': page,
         'page_count': page_count,
@@ -45,11 +148,93 @@ def page_list(page, page_count, query_string=None, end_padding=1, page_padding=2
     }
 
 
-@register.inclusion_tag('govuk_template_base/pagination.html')
-def pagination(prev_url, next_url, prev_title=None, next_title=None, prev=_('Previous'), next=_('Next')):
+@register.simple_tag(takes_context=True)
+@timed('govuk-components')
+def page_list(context, page, page_count, query_string=None, end_padding=1, page_padding=2):
+    values = page_list_context(page, page_count, query_string, end_padding, page_padding)
+    if all(isinstance(value, int) for value in (page, page_count)) and \
+            packaged_templates.is_packaged(context.template.engine, page_list_template_name):
+        return render_page_list(autoescape=context.autoescape, use_l10n=context.use_l10n, **values)
+    return mark_safe(render_inclusion(context, page_list_template_name, values))
+
+
+def page_list_without_count_context(page, has_next, approximate_page_count=None, query_string=None,
+                                    end_padding=1, page_padding=2):
+    last_linked_page = page + 1 if has_next else page
+    pages_with_ellipses = with_ellipses((
+        range(1, end_padding + 2),
+        range(page - page_padding, last_linked_page + 1),
+    ), last_linked_page)
+    if has_next:
+        pages_with_ellipses.append(None)
+    if approximate_page_count is not None and approximate_page_count <= page:
+        approximate_page_count = None
+    return {
+        'page': page,
+        'has_next': has_next,
+        'approximate_page_count': approximate_page_count,
+        'page_range': pages_with_ellipses,
+        'query_string': query_string,
+    }
+
+
+@register.simple_tag(takes_context=True)
+@timed('govuk-components')
+def page_list_without_count(context, page, has_next, approximate_page_count=None, query_string=None,
+                            end_padding=1, page_padding=2):
+    """
+    Page list for when counting all pages is too slow: only links up to the next page are shown
+    and the total is described as “many” or using an approximate page count
+    """
+    values = page_list_without_count_context(page, has_next, approximate_page_count, query_string,
+                                             end_padding, page_padding)
+    return mark_safe(render_inclusion(context, page_list_without_count_template_name, values))
+
+
+def pagination_context(prev_url, next_url, prev_title=None, next_title=None, prev=_('Previous'), next=_('Next')):
     context = {'prev': prev, 'next': next}
     if prev_url:
         context['prev_page'] = {'title': prev_title, 'url': prev_url}
     if next_url:
         context['next_page'] = {'title': next_title, 'url': next_url}
     return context
+
+
+@register.simple_tag(takes_context=True)
+@timed('govuk-components')
+def pagination(context, prev_url, next_url, prev_title=None, next_title=None, prev=_('Previous'), next=_('Next')):
+    values = pagination_context(prev_url, next_url, prev_title, next_title, prev, next)
+    if packaged_templates.is_packaged(context.template.engine, pagination_template_name):
+        return render_pagination(autoescape=context.autoescape, use_l10n=context.use_l10n, **values)
+    return mark_safe(render_inclusion(context, pagination_template_name, values))
+
+
+def keyset_page_list_context(page, query_string=None):
+    page_links = []
+    if page.has_previous:
+        if page.number > 2:
+            page_links.append({'number': 1, 'url': page.first_url(query_string)})
+        if page.number > 3:
+            page_links.append(None)
+        page_links.append({'number': page.number - 1, 'url': page.previous_url(query_string)})
+    page_links.append({'number': page.number, 'url': page.current_url(query_string)})
+    if page.has_next:
+        page_links.append({'number': page.number + 1, 'url': page.next_url(query_string)})
+    return {
+        'page': page,
+        'page_links': page_links,
+    }
+
+
+@register.simple_tag(takes_context=True)
+@timed('govuk-components')
+def keyset_page_list(context, page, query_string=None):
+    values = keyset_page_list_context(page, query_string)
+    return mark_safe(render_inclusion(context, keyset_page_list_template_name, values))
+
+
+@register.simple_tag(takes_context=True)
+def keyset_pagination(context, page, query_string=None, prev_title=None, next_title=None,
+                      prev=_('Previous'), next=_('Next')):
+    return pagination(context, page.previous_url(query_string), page.next_url(query_string),
+                      prev_title=prev_title, next_title=next_title, prev=prev, next=next)
@@ -0,0 +1,99 @@
+import collections
+import contextlib
+import functools
+import threading
+import time
+
+
+class Stage:
+    __slots__ = ('duration', 'queries', 'calls', 'depth')
+
+    def __init__(self):
+        self.duration = 0.0
+        self.queries = 0
+        self.calls = 0
+        self.depth = 0
+
+    def __repr__(self):
+        return '<Stage %.3fms, %d queries, %d calls>' % (self.duration * 1000, self.queries, self.calls)
+
+
+class Timings:
+    """
+    Time spent and database queries made in each stage of one request;
+    stages are inclusive so time spent reversing a link in the header also counts towards components
+    """
+
+    def __init__(self):
+        self.stages = collections.OrderedDict()
+        self.active_stages = []
+        self.queries = 0
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        try:
+            stage = self.stages[name]
+        except KeyError:
+            stage = Stage()
+            self.stages[name] = stage
+        stage.calls += 1
+        if stage.depth:
+            # re-entered, e.g. a translation lookup inside another one, so time is already being recorded
+            yield stage
+            return
+        stage.depth += 1
+        self.active_stages.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.duration += time.perf_counter() - start
+            self.active_stages.remove(stage)
+            stage.depth -= 1
+
+    def count_query(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper attributing queries to active stages
+        """
+        self.queries += 1
+        for stage in self.active_stages:
+            stage.queries += 1
+        return execute(sql, params, many, context)
+
+
+class TimingRecorder(threading.local):
+    """
+    Holds timings for the request being handled in the current thread, if any is being recorded
+    """
+    timings = None
+
+    def start(self):
+        self.timings = Timings()
+        return self.timings
+
+    def stop(self):
+        timings = self.timings
+        self.timings = None
+        return timings
+
+
+timing_recorder = TimingRecorder()
+
+
+def timed(name):
+    """
+    Decorator recording time spent in a function when the current request is being timed
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            timings = timing_recorder.timings
+            if timings is None:
+                return func(*args, **kwargs)
+            with timings.stage(name):
+                return func(*args, **kwargs)
+
+        return inner
+
+    return decorator
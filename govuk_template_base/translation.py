@@ -0,0 +1,57 @@
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.autoreload import file_changed
+from django.utils.translation import get_language, gettext
+
+from govuk_template_base.timing import timed
+
+
+class StringTables:
+    """
+    Caches translated strings as plain dictionaries for each active language
+    """
+
+    def __init__(self):
+        self.tables = {}
+
+    def clear(self, **kwargs):
+        self.tables = {}
+
+    @timed('govuk-translation')
+    def get(self, name, factory):
+        """
+        Returns a table built by calling `factory` while the current language is active
+        """
+        key = (get_language(), name)
+        try:
+            return self.tables[key]
+        except KeyError:
+            table = factory()
+            self.tables[key] = table
+            return table
+
+    @timed('govuk-translation')
+    def gettext(self, message):
+        messages = self.get('gettext', dict)
+        try:
+            return messages[message]
+        except KeyError:
+            translated = gettext(message)
+            messages[message] = translated
+            return translated
+
+
+string_tables = StringTables()
+
+
+@receiver(setting_changed)
+def clear_string_tables(setting, **kwargs):
+    if setting in ('LANGUAGES', 'LANGUAGE_CODE', 'LOCALE_PATHS',
+                   'USE_L10N', 'USE_THOUSAND_SEPARATOR', 'THOUSAND_SEPARATOR', 'NUMBER_GROUPING'):
+        string_tables.clear()
+
+
+@receiver(file_changed)
+def translation_file_changed(file_path, **kwargs):
+    if file_path.suffix == '.mo':
+        string_tables.clear()
@@ -0,0 +1,88 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, engines
+from django.utils import translation
+
+from govuk_template_base.context_processors import template_messages
+from govuk_template_base.renderers import (
+    jinja2_template_path, keyset_page_list_template_name, packaged_templates, page_list_template_name,
+    page_list_without_count_template_name, pagination_template_name,
+)
+from govuk_template_base.service_settings import (
+    ServicePhase, default_settings, service_settings_cache, static_service_settings,
+)
+from govuk_template_base.translation import string_tables
+
+logger = logging.getLogger(__name__)
+
+component_template_names = (
+    page_list_template_name,
+    page_list_without_count_template_name,
+    pagination_template_name,
+    keyset_page_list_template_name,
+)
+
+
+def warm_up_templates():
+    """
+    Compiles templates into each engine’s cached loaders
+    """
+    template_names = list(getattr(settings, 'GOVUK_WARM_UP_TEMPLATES', ['base.html']))
+    template_names.extend(component_template_names)
+    for backend in engines.all():
+        for template_name in template_names:
+            try:
+                backend.get_template(template_name)
+            except TemplateDoesNotExist:
+                logger.debug('Template %s not found in %s engine', template_name, backend.name)
+        for template_name in component_template_names:
+            if hasattr(backend, 'env'):
+                packaged_templates.is_packaged(backend.env, template_name, path=jinja2_template_path)
+            elif hasattr(backend, 'engine'):
+                packaged_templates.is_packaged(backend.engine, template_name)
+
+
+def warm_up_service_settings():
+    """
+    Loads service settings for all hosts; returns them or an empty list if the database is not set up
+    """
+    if static_service_settings.service_settings is not None:
+        return [static_service_settings.service_settings]
+    try:
+        default_settings()
+    except DatabaseError:
+        logger.warning('Service settings could not be loaded, the database may not be migrated')
+        return []
+    return list(service_settings_cache.host_settings.values())
+
+
+def warm_up_translations(host_settings):
+    """
+    Loads translation catalogues and translated strings for every language
+    """
+    for language_code, _ in settings.LANGUAGES:
+        with translation.override(language_code):
+            string_tables.get('template_messages', template_messages)
+            string_tables.get('phase_names', ServicePhase.names)
+            for service_settings in host_settings:
+                service_settings.localised_name
+                for link in service_settings.get_header_links():
+                    link.localised_name
+                for link in service_settings.get_footer_links():
+                    link.localised_name
+
+
+def warm_up():
+    """
+    Prepares state that is otherwise built while handling the first requests; when run before
+    worker processes are forked, e.g. with gunicorn’s `--preload`, workers share it copy-on-write
+    """
+    warm_up_templates()
+    host_settings = warm_up_service_settings()
+    warm_up_translations(host_settings)
+    # forked workers must not share database connections, but tests may be running within a transaction
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close()
@@ -17,9 +17,11 @@ package_info = importlib.import_module('govuk_template_base')
 setup_extensions = importlib.import_module('govuk_template_base.setup_extensions')
 
 setup_requires = ['setuptools', 'pip', 'wheel']
-install_requires = ['django>=1.11']
+install_requires = ['django>=2.2']
 extras_require = {
+    'brotli': ['brotli'],
     'forms': ['django-govuk-forms'],
+    'jinja2': ['jinja2>=2.10'],
     'scss': ['libsass'],
     'watch': ['watchdog'],
 }
@@ -32,7 +34,7 @@ setup(
     author=package_info.__author__,
     author_email=package_info.__email__,
     url='https://github.com/ministryofjustice/django-govuk-template',
-    packages=find_packages(exclude=['demo', 'tests']),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*', 'demo', 'tests']),
     include_package_data=True,
     license='MIT',
     description='Django app that builds `template` and `elements` components from '
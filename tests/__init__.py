@@ -0,0 +1,37 @@
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY='test test test test test test test test test test ',
+        DEBUG=False,
+        LANGUAGE_CODE='en-gb',
+        USE_I18N=True,
+        USE_TZ=True,
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django.contrib.staticfiles',
+            'govuk_template_base',
+        ],
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'APP_DIRS': True,
+        }],
+        ROOT_URLCONF='tests.urls',
+        STATIC_URL='/static/',
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+    )
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    # tests are run by `setup.py test` or pytest rather than django’s test runner
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from tests.urls import view
+
+urlpatterns = [
+    path('other/page/', view, name='page'),
+]
@@ -0,0 +1,144 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+from django.utils.http import http_date
+
+from govuk_template_base.compression import (
+    PrecompressedStaticFiles, choose_variant, compress_file, get_encoding_qualities, is_encoding_accepted,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+css = b'.govuk-body { color: #0b0c0c; }\n' * 100
+
+
+class AcceptEncodingTestCase(SimpleTestCase):
+    def test_encoding_qualities(self):
+        self.assertEqual(get_encoding_qualities(''), {})
+        self.assertEqual(get_encoding_qualities('gzip, deflate, br'), {'gzip': 1.0, 'deflate': 1.0, 'br': 1.0})
+        self.assertEqual(get_encoding_qualities('GZIP ; q=0.5,br;q=0 , *;q=0.1'), {'gzip': 0.5, 'br': 0.0, '*': 0.1})
+        self.assertEqual(get_encoding_qualities('gzip;q=high, ,br'), {'gzip': 0.0, 'br': 1.0})
+
+    def test_encoding_accepted(self):
+        self.assertTrue(is_encoding_accepted('gzip', {'gzip': 0.5}))
+        self.assertFalse(is_encoding_accepted('gzip', {'br': 1.0}))
+        self.assertTrue(is_encoding_accepted('gzip', {'*': 1.0}))
+        self.assertFalse(is_encoding_accepted('gzip', {'*': 0.0}))
+        # explicit refusals are not overridden by the wildcard
+        self.assertFalse(is_encoding_accepted('gzip', {'gzip': 0.0, '*': 1.0}))
+        self.assertTrue(is_encoding_accepted('gzip', {'gzip': 1.0, '*': 0.0}))
+
+
+class PrecompressedTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = self.write_file('app.css', css)
+
+    def write_file(self, file_name, content):
+        path = os.path.join(self.root, file_name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def touch(self, path, seconds):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+class CompressFileTestCase(PrecompressedTestCase):
+    def test_variants_written_once(self):
+        written = compress_file(self.path)
+        self.assertIn(self.path + '.gz', written)
+        self.assertEqual(len(written), 2 if brotli else 1)
+        with gzip.open(self.path + '.gz') as f:
+            self.assertEqual(f.read(), css)
+        self.assertEqual(os.stat(self.path + '.gz').st_mtime_ns, os.stat(self.path).st_mtime_ns)
+        self.assertEqual(compress_file(self.path), [])
+
+    def test_stale_variants_rewritten(self):
+        compress_file(self.path)
+        self.write_file('app.css', css * 2)
+        self.touch(self.path, 1)
+        self.assertIn(self.path + '.gz', compress_file(self.path))
+        with gzip.open(self.path + '.gz') as f:
+            self.assertEqual(f.read(), css * 2)
+
+    def test_variants_not_larger_than_file(self):
+        compress_file(self.path)
+        self.write_file('app.css', b'a')
+        self.touch(self.path, 1)
+        self.assertEqual(compress_file(self.path), [])
+        self.assertFalse(os.path.exists(self.path + '.gz'))
+
+    def test_variant_chosen(self):
+        self.assertEqual(choose_variant(self.path, 'gzip'), (self.path, None))
+        compress_file(self.path)
+        self.assertEqual(choose_variant(self.path, 'gzip'), (self.path + '.gz', 'gzip'))
+        self.assertEqual(choose_variant(self.path, 'gzip;q=0, *'), (self.path, None) if not brotli
+                         else (self.path + '.br', 'br'))
+        self.assertEqual(choose_variant(self.path, 'identity'), (self.path, None))
+        self.assertEqual(choose_variant(self.path, ''), (self.path, None))
+        self.touch(self.path, 1)
+        self.assertEqual(choose_variant(self.path, 'gzip'), (self.path, None))
+
+    def test_variant_not_chosen_for_other_files(self):
+        path = self.write_file('image.png', css)
+        compress_file(path)
+        self.assertEqual(choose_variant(path, 'gzip'), (path, None))
+
+
+def start_response(status, headers, exc_info=None):
+    start_response.status = status
+    start_response.headers = dict(headers)
+
+
+def application(environ, start_response):
+    start_response('404 Not Found', [])
+    return [b'application']
+
+
+class PrecompressedStaticFilesTestCase(PrecompressedTestCase):
+    def setUp(self):
+        super().setUp()
+        compress_file(self.path)
+        self.static_files = PrecompressedStaticFiles(application, root=self.root, prefix='/static/', max_age=60)
+
+    def get(self, path, method='GET', **environ):
+        environ.update(REQUEST_METHOD=method, PATH_INFO=path)
+        return b''.join(self.static_files(environ, start_response))
+
+    def test_variant_served(self):
+        content = self.get('/static/app.css', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzip.decompress(content), css)
+        self.assertEqual(start_response.status, '200 OK')
+        self.assertEqual(start_response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(start_response.headers['Content-Type'], 'text/css')
+        self.assertEqual(start_response.headers['Content-Length'], str(len(content)))
+        self.assertEqual(start_response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(start_response.headers['Cache-Control'], 'max-age=60, public')
+
+    def test_file_served(self):
+        self.assertEqual(self.get('/static/app.css', HTTP_ACCEPT_ENCODING='gzip;q=0'), css)
+        self.assertNotIn('Content-Encoding', start_response.headers)
+        self.assertEqual(self.get('/static/app.css', method='HEAD'), b'')
+        self.assertEqual(start_response.headers['Content-Length'], str(len(css)))
+
+    def test_not_modified(self):
+        last_modified = http_date(os.stat(self.path).st_mtime)
+        self.assertEqual(self.get('/static/app.css', HTTP_IF_MODIFIED_SINCE=last_modified), b'')
+        self.assertEqual(start_response.status, '304 Not Modified')
+
+    def test_other_requests_passed_on(self):
+        for path, method in (('/app.css', 'GET'), ('/static/missing.css', 'GET'), ('/static/../app.css', 'GET'),
+                             ('/static/', 'GET'), ('/static/app.css', 'POST')):
+            with self.subTest(path=path, method=method):
+                self.assertEqual(self.get(path, method=method), b'application')
+                self.assertEqual(start_response.status, '404 Not Found')
@@ -0,0 +1,154 @@
+import io
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+
+from govuk_template_base.management.commands.devserver import Command, LiveReloadHandler
+from govuk_template_base.scss import build_scss, get_app_dest_path, get_app_source_path, get_scss_builds
+
+try:
+    import sass
+except ImportError:
+    sass = None
+
+
+class ScheduledBuilds:
+    def __init__(self):
+        self.app_labels = []
+
+    def schedule(self, app_labels):
+        self.app_labels.append(sorted(app_labels))
+
+
+@unittest.skipUnless(sass, 'libsass is not installed')
+class ScheduleBuildTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root_path)
+        settings_override = override_settings(GOVUK_BUILDSCSS_CACHE_DIR=os.path.join(root_path, 'cache'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.source_paths = {}
+        for app_label in ('a', 'b', 'c'):
+            app_config = types.SimpleNamespace(label=app_label, path=os.path.join(root_path, app_label))
+            self.source_paths[app_label] = get_app_source_path(app_config)
+            os.makedirs(self.source_paths[app_label])
+        self.write_source('a', '_shared.scss', '$width: 1px;')
+        self.write_source('a', 'a.scss', '@import "shared";\n.a { width: $width; }')
+        self.write_source('b', 'b.scss', '@import "shared";\n.b { width: $width; }')
+        self.write_source('c', 'c.scss', '@import "later";\n.c { width: 1px; }')
+        include_paths = list(self.source_paths.values())
+        build_scss(get_scss_builds([
+            (source_path, get_app_dest_path(source_path))
+            for source_path in include_paths
+        ], include_paths=include_paths))
+
+        self.command = Command(stdout=io.StringIO(), stderr=io.StringIO())
+        self.command.app_source_paths = self.source_paths
+        self.command.build_options = {'verbosity': 0}
+        self.command.build_worker = ScheduledBuilds()
+
+    def write_source(self, app_label, file_name, content):
+        with open(self.source_path(app_label, file_name), 'w') as f:
+            f.write(content)
+
+    def source_path(self, app_label, file_name):
+        return os.path.join(self.source_paths[app_label], file_name)
+
+    def test_changed_files_build_apps_that_use_them(self):
+        self.assertEqual(sorted(self.command.get_app_labels_to_build(self.source_path('a', '_shared.scss'))),
+                         ['a', 'b'])
+        self.assertEqual(self.command.get_app_labels_to_build(self.source_path('b', 'b.scss')), ['b'])
+        self.assertEqual(self.command.get_app_labels_to_build(self.source_path('c', 'c.scss')), ['c'])
+        self.assertEqual(self.command.get_app_labels_to_build(os.path.join(tempfile.gettempdir(), 'x.scss')), [])
+
+    def test_created_files_build_apps_that_might_import_them(self):
+        # a file created in another app could shadow an import that currently resolves elsewhere
+        self.assertEqual(sorted(self.command.get_app_labels_to_build(self.source_path('b', '_shared.scss'),
+                                                                     created=True)),
+                         ['a', 'b', 'c'])
+        # satisfies an import that previously failed
+        self.assertEqual(sorted(self.command.get_app_labels_to_build(self.source_path('b', '_later.scss'),
+                                                                     created=True)),
+                         ['a', 'b', 'c'])
+        # not imported anywhere
+        self.assertEqual(self.command.get_app_labels_to_build(self.source_path('b', '_other.scss'), created=True),
+                         ['b'])
+        # an editor’s atomic save recreates a known dependency
+        self.assertEqual(sorted(self.command.get_app_labels_to_build(self.source_path('a', '_shared.scss'),
+                                                                     created=True)),
+                         ['a', 'b'])
+
+    def test_moved_files_schedule_builds(self):
+        self.command.on_moved(types.SimpleNamespace(
+            src_path=self.source_path('b', '.b.scss.swp'),
+            dest_path=self.source_path('b', 'b.scss'),
+        ))
+        self.command.on_modified(types.SimpleNamespace(src_path=self.source_path('b', 'notes.txt')))
+        self.assertEqual(self.command.build_worker.app_labels, [['b']])
+
+
+def start_response(status, headers, exc_info=None):
+    start_response.status = status
+    start_response.headers = dict(headers)
+
+
+class LiveReloadHandlerTestCase(SimpleTestCase):
+    def get_response(self, response, path='/', script_name=''):
+        def application(environ, start_response):
+            start_response('200 OK', list(response.items()))
+            return response
+
+        environ = {'PATH_INFO': path, 'SCRIPT_NAME': script_name}
+        return LiveReloadHandler(application)(environ, start_response)
+
+    def test_script_injected_before_last_body_end(self):
+        response = HttpResponse('<p>&lt;/body&gt;</p></body><!-- </BODY > -->')
+        response['Content-Length'] = len(response.content)
+        response = self.get_response(response, script_name='/app')
+        content = response.content.decode()
+        self.assertTrue(content.startswith('<p>&lt;/body&gt;</p></body><!-- <script>'))
+        self.assertTrue(content.endswith('</script>\n</BODY > -->'))
+        self.assertIn('new EventSource("/app/__live-reload__")', content)
+        self.assertEqual(start_response.headers['Content-Length'], str(len(response.content)))
+
+    def test_script_not_injected_into_other_responses(self):
+        responses = [
+            HttpResponse('</body>', content_type='text/plain'),
+            JsonResponse({'html': '</body>'}),
+            StreamingHttpResponse(iter(['</body>'])),
+        ]
+        compressed_response = HttpResponse('</body>')
+        compressed_response['Content-Encoding'] = 'gzip'
+        responses.append(compressed_response)
+        for response in responses:
+            with self.subTest(response=response):
+                content = b''.join(self.get_response(response))
+                self.assertNotIn(b'<script>', content)
+
+    def test_stylesheet_paths_streamed(self):
+        handler = LiveReloadHandler(None)
+        events = handler.stream_events()
+        self.assertEqual(next(events), b': connected\n\n')
+        handler.publish(['/static/stylesheets/app.css'])
+        self.assertEqual(next(events), b'event: css\ndata: ["/static/stylesheets/app.css"]\n\n')
+        events.close()
+        self.assertEqual(handler.listeners, set())
+
+    def test_stylesheet_paths_served_from_apps(self):
+        command = Command()
+        source_path = os.path.join(tempfile.gettempdir(), 'app', 'static-src', 'stylesheets')
+        command.app_source_paths = {'app': source_path}
+        dest_path = get_app_dest_path(source_path)
+        self.assertEqual(command.get_stylesheet_paths([
+            os.path.join(dest_path, 'app.css'),
+            os.path.join(dest_path, 'print', 'print.css'),
+            os.path.join(tempfile.gettempdir(), 'other.css'),
+        ]), ['/static/stylesheets/app.css', '/static/stylesheets/print/print.css'])
@@ -0,0 +1,73 @@
+import re
+import unittest
+
+from django.test import SimpleTestCase, override_settings
+
+from govuk_template_base.renderers import page_list_template_name, pagination_template_name
+from govuk_template_base.templatetags.govuk_template_base import page_list_context, pagination_context
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+tag_spacing_pattern = re.compile(r'\s*(<[^>]*>)\s*')
+
+
+@unittest.skipUnless(jinja2, 'Jinja2 is not installed')
+class Jinja2EnvironmentTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        from django.template.backends.jinja2 import Jinja2
+
+        self.backend = Jinja2({
+            'NAME': 'jinja2',
+            'DIRS': [],
+            'APP_DIRS': True,
+            'OPTIONS': {'environment': 'govuk_template_base.jinja2.environment'},
+        })
+
+    def render_string(self, template_string, context=None):
+        return self.backend.from_string(template_string).render(context)
+
+    def render_template(self, template_name, values):
+        return self.backend.env.get_template(template_name).render(values)
+
+    def assertHTMLMatches(self, html, expected):
+        # fast renderers reproduce the whitespace of Django templates which differs from Jinja2’s
+        self.assertEqual(tag_spacing_pattern.sub(r'\1', html), tag_spacing_pattern.sub(r'\1', expected))
+
+    def test_page_list_matches_template(self):
+        for page, page_count in ((1, 1), (3, 6), (10, 20), (1234, 5000)):
+            for query_string in (None, 'q=a&b=<c>'):
+                with self.subTest(page=page, page_count=page_count, query_string=query_string):
+                    self.assertHTMLMatches(
+                        self.render_string('{{ page_list(page, page_count, query_string) }}', {
+                            'page': page, 'page_count': page_count, 'query_string': query_string,
+                        }),
+                        self.render_template(page_list_template_name,
+                                             page_list_context(page, page_count, query_string)),
+                    )
+
+    def test_pagination_matches_template(self):
+        values = {'prev_url': '?page=1', 'next_url': '?a=1&page=3', 'next_title': 'Third & last'}
+        self.assertHTMLMatches(
+            self.render_string('{{ pagination(prev_url, next_url, next_title=next_title) }}', values),
+            self.render_template(pagination_template_name,
+                                 pagination_context(values['prev_url'], values['next_url'],
+                                                    next_title=values['next_title'])),
+        )
+
+    def test_translations_and_filters(self):
+        self.assertEqual(self.render_string("{{ _('Page') }} {{ 1234567|separate_thousands }}"), 'Page 1,234,567')
+
+    @override_settings(GOVUK_SERVICE_SETTINGS={'name': 'Static <service>'})
+    def test_service_settings(self):
+        self.assertEqual(self.render_string('{{ get_service_settings().name }}'), 'Static &lt;service&gt;')
+
+    def test_user_extensions_kept(self):
+        from govuk_template_base.jinja2 import environment
+
+        env = environment(extensions=['jinja2.ext.loopcontrols'])
+        self.assertIn('jinja2.ext.LoopControlExtension', env.extensions)
+        self.assertIn('jinja2.ext.InternationalizationExtension', env.extensions)
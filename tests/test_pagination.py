@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from govuk_template_base.models import Link, ServiceSettings
+from govuk_template_base.pagination import CountFreePaginator, KeysetPaginator
+
+
+class PaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # repeated names make the primary key necessary to order links uniquely
+        for name in ('a', 'b', 'b', 'c', 'd', 'd', 'd', 'e'):
+            Link.objects.create(name=name, link='https://example.com/%s' % name)
+        cls.ordered_links = list(Link.objects.order_by('name', 'pk'))
+
+
+class KeysetPaginatorTestCase(PaginationTestCase):
+    def test_pages_forwards_and_backwards(self):
+        paginator = KeysetPaginator(Link.objects.all(), 3, ordering=['name'])
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        self.assertEqual([link for page in pages for link in page], self.ordered_links)
+        self.assertFalse(pages[0].has_previous)
+        self.assertFalse(pages[-1].has_next)
+
+        page = pages[-1]
+        while page.has_previous:
+            previous_page = paginator.get_page(page.previous_cursor)
+            self.assertEqual(previous_page.number, page.number - 1)
+            self.assertEqual(list(previous_page), list(pages[page.number - 2]))
+            self.assertTrue(previous_page.has_next)
+            page = previous_page
+        self.assertEqual(page.number, 1)
+
+    def test_descending_ordering(self):
+        paginator = KeysetPaginator(Link.objects.all(), 3, ordering=['-name'])
+        first_page = paginator.get_page()
+        second_page = paginator.get_page(first_page.next_cursor)
+        expected = list(Link.objects.order_by('-name', 'pk'))
+        self.assertEqual(list(first_page) + list(second_page), expected[:6])
+        self.assertEqual(list(paginator.get_page(second_page.previous_cursor)), list(first_page))
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = KeysetPaginator(Link.objects.all(), 3, ordering=['name'])
+        page = paginator.get_page('invalid')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(list(page), self.ordered_links[:3])
+
+    def test_urls(self):
+        paginator = KeysetPaginator(Link.objects.all(), 3, ordering=['name'])
+        page = paginator.get_page()
+        self.assertIsNone(page.previous_url('q=1'))
+        self.assertTrue(page.next_url('q=1').startswith('?q=1&cursor='))
+        second_page = paginator.get_page(page.next_cursor)
+        self.assertEqual(second_page.previous_url('q=1'), '?q=1')
+
+    def test_unsupported_ordering(self):
+        with self.assertRaises(ValueError):
+            KeysetPaginator(Link.objects.all(), 3, ordering=['?'])
+        with self.assertRaises(ValueError):
+            KeysetPaginator(ServiceSettings.objects.all(), 3, ordering=['header_links__name'])
+
+    def test_nullable_ordering(self):
+        with self.assertRaisesMessage(ValueError, 'nullable field last_login'):
+            KeysetPaginator(get_user_model().objects.all(), 3, ordering=['-last_login'])
+
+
+class CountFreePaginatorTestCase(PaginationTestCase):
+    def test_pages(self):
+        paginator = CountFreePaginator(Link.objects.order_by('name', 'pk'), 3)
+        page = paginator.get_page(2)
+        self.assertEqual(list(page), self.ordered_links[3:6])
+        self.assertTrue(page.has_previous)
+        self.assertTrue(page.has_next)
+        page = paginator.get_page(3)
+        self.assertEqual(list(page), self.ordered_links[6:])
+        self.assertFalse(page.has_next)
+
+    def test_invalid_number_returns_first_page(self):
+        paginator = CountFreePaginator(Link.objects.order_by('name', 'pk'), 3)
+        self.assertEqual(paginator.get_page('invalid').number, 1)
+        self.assertEqual(paginator.get_page(-1).number, 1)
+
+    def test_number_beyond_end_returns_last_page(self):
+        paginator = CountFreePaginator(Link.objects.order_by('name', 'pk'), 3)
+        page = paginator.get_page(10)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(list(page), self.ordered_links[6:])
+        self.assertFalse(page.has_next)
+
+    def test_empty_queryset(self):
+        page = CountFreePaginator(Link.objects.none(), 3).get_page(2)
+        self.assertEqual(page.number, 1)
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_previous)
+        self.assertFalse(page.has_next)
+
+    def test_approximate_page_count_needs_postgresql(self):
+        paginator = CountFreePaginator(Link.objects.order_by('name', 'pk'), 3, estimate_page_count=True)
+        self.assertIsNone(paginator.get_page(1).approximate_page_count)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from govuk_template_base.purge import CssPurger, get_purger, get_template_dirs, get_used_names
+
+
+class CssPurgerTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.purger = CssPurger(['govuk-header', 'govuk-header__link', 'main', 'govuk-grid-column-'])
+
+    def test_unused_rules_removed(self):
+        self.assertEqual(
+            self.purger.purge('.govuk-header{color:red}.govuk-footer{color:blue}#main{margin:0}#other{margin:0}'),
+            '.govuk-header{color:red}#main{margin:0}',
+        )
+
+    def test_unused_selectors_removed(self):
+        self.assertEqual(
+            self.purger.purge('.govuk-header a,.govuk-footer a,body,.govuk-header .govuk-footer{color:red}'),
+            '.govuk-header a,body{color:red}',
+        )
+
+    def test_nested_rules_purged(self):
+        self.assertEqual(
+            self.purger.purge(
+                '@media print{.govuk-header{display:none}.govuk-footer{display:none}}'
+                '@media (min-width:40em){@supports (display:grid){.govuk-footer{display:grid}}}'
+                '@font-face{font-family:x;src:url(x.woff)}'
+            ),
+            '@media print{.govuk-header{display:none}}@font-face{font-family:x;src:url(x.woff)}',
+        )
+
+    def test_ignored_selectors_kept(self):
+        self.assertEqual(
+            self.purger.purge(
+                '.govuk-header:not(.govuk-footer){color:red}'
+                '[class^="govuk-footer"]{color:blue}'
+                '.govuk-footer:not(.govuk-header){color:green}'
+            ),
+            '.govuk-header:not(.govuk-footer){color:red}[class^="govuk-footer"]{color:blue}',
+        )
+
+    def test_allowlist_and_prefixes_kept(self):
+        self.assertEqual(
+            self.purger.purge(
+                '.js-enabled .govuk-header{display:block}'
+                '.govuk-grid-column-one-half{width:50%}'
+                '.govuk-grid-row{margin:0}'
+            ),
+            '.js-enabled .govuk-header{display:block}.govuk-grid-column-one-half{width:50%}',
+        )
+        purger = CssPurger(['govuk-header'], allowlist=['govuk-footer*'])
+        self.assertEqual(purger.purge('.js-enabled{color:red}.govuk-footer__link{color:blue}'),
+                         '.govuk-footer__link{color:blue}')
+        self.assertNotEqual(purger.fingerprint, self.purger.fingerprint)
+
+    def test_comments_strings_and_statements_kept(self):
+        css = '@charset "UTF-8";/*! licence */.govuk-header::before{content:"}.govuk-footer{"}@import url(x.css);'
+        self.assertEqual(self.purger.purge(css), css)
+        self.assertEqual(self.purger.purge(r'.govuk-header\:hover{color:red}'), '')
+        self.assertEqual(CssPurger(['govuk-header:hover']).purge(r'.govuk-header\:hover{color:red}'),
+                         r'.govuk-header\:hover{color:red}')
+
+
+class UsedNamesTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.template_dir)
+        os.makedirs(os.path.join(self.template_dir, 'app'))
+        with open(os.path.join(self.template_dir, 'app', 'page.html'), 'w') as f:
+            f.write('<div class="govuk-grid-column-{{ width }} app-page" id="main">{% block content %}{% endblock %}')
+
+    def test_used_names(self):
+        names = get_used_names([self.template_dir])
+        self.assertTrue({'govuk-grid-column-', 'app-page', 'main', 'content'} <= names)
+
+    def test_template_dirs(self):
+        with override_settings(TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [self.template_dir, os.path.join(self.template_dir, 'missing')],
+            'APP_DIRS': True,
+        }]):
+            template_dirs = get_template_dirs()
+        self.assertIn(os.path.abspath(self.template_dir), template_dirs)
+        self.assertTrue(all(map(os.path.isdir, template_dirs)))
+
+    @override_settings(GOVUK_PURGE_CSS_ALLOWLIST=['app-*'])
+    def test_purger(self):
+        purger = get_purger()
+        self.assertEqual(purger.allowlist, ('app-*',))
+        self.assertEqual(
+            purger.purge('.govuk-pagination{color:red}.app-widget{color:blue}.govuk-unused-name{margin:0}'),
+            '.govuk-pagination{color:red}.app-widget{color:blue}',
+        )
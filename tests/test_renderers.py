@@ -0,0 +1,52 @@
+from django.template import Context, engines
+from django.test import SimpleTestCase
+from django.utils import translation
+
+from govuk_template_base.renderers import (
+    packaged_templates, page_list_template_name, pagination_template_name, render_page_list, render_pagination,
+)
+from govuk_template_base.templatetags.govuk_template_base import page_list_context, pagination_context
+from govuk_template_base.translation import string_tables
+
+
+class RendererTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.engine = engines['django'].engine
+        string_tables.clear()
+        self.addCleanup(string_tables.clear)
+
+    def render_template(self, template_name, values, autoescape=True):
+        template = self.engine.get_template(template_name)
+        return template.render(Context(values, autoescape=autoescape))
+
+    def test_templates_are_packaged(self):
+        self.assertTrue(packaged_templates.is_packaged(self.engine, page_list_template_name))
+        self.assertTrue(packaged_templates.is_packaged(self.engine, pagination_template_name))
+
+    def test_page_list_matches_template(self):
+        for page, page_count in ((1, 1), (1, 2), (3, 6), (1, 20), (10, 20), (20, 20), (1234, 5000)):
+            for query_string in (None, 'q=a&b=<c>'):
+                for autoescape in (True, False):
+                    values = page_list_context(page, page_count, query_string)
+                    with self.subTest(page=page, page_count=page_count, query_string=query_string,
+                                      autoescape=autoescape):
+                        self.assertEqual(
+                            render_page_list(autoescape=autoescape, **values),
+                            self.render_template(page_list_template_name, values, autoescape=autoescape),
+                        )
+
+    def test_page_list_matches_template_in_other_language(self):
+        values = page_list_context(5, 12)
+        with translation.override('cy'):
+            self.assertEqual(render_page_list(**values), self.render_template(page_list_template_name, values))
+
+    def test_pagination_matches_template(self):
+        for prev_url, next_url in ((None, None), ('?page=1', None), (None, '?page=3'), ('?page=1', '?a=1&page=3')):
+            for prev_title, next_title in ((None, None), ('First <page>', 'Third & last')):
+                values = pagination_context(prev_url, next_url, prev_title, next_title)
+                with self.subTest(prev_url=prev_url, next_url=next_url, prev_title=prev_title):
+                    self.assertEqual(
+                        render_pagination(**values),
+                        self.render_template(pagination_template_name, values),
+                    )
@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.test import SimpleTestCase, override_settings
+
+from govuk_template_base.scss import (
+    build_scss, decode_vlq, get_dependencies, get_manifest_storage, get_scss_builds, get_source_sizes,
+    update_staticfiles_manifest,
+)
+
+try:
+    import sass
+except ImportError:
+    sass = None
+
+
+@unittest.skipUnless(sass, 'libsass is not installed')
+class IncrementalScssBuildTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root_path)
+        self.source_path = os.path.join(root_path, 'static-src', 'stylesheets')
+        self.dest_path = os.path.join(root_path, 'static', 'stylesheets')
+        self.cache_path = os.path.join(root_path, 'cache')
+        os.makedirs(self.source_path)
+        self.writes = 0
+        settings_override = override_settings(GOVUK_BUILDSCSS_CACHE_DIR=self.cache_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.write_source('_colours.scss', '$text-colour: #0b0c0c;')
+        self.write_source('app.scss', '@import "colours";\nbody { color: $text-colour; }')
+        self.write_source('print.scss', 'body { background: #fff; }')
+
+    def write_source(self, file_name, content):
+        path = os.path.join(self.source_path, file_name)
+        with open(path, 'w') as f:
+            f.write(content)
+        # ensure that the modification time changes even on file systems with coarse timestamps
+        stat = os.stat(path)
+        self.writes += 1
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + self.writes * 10 ** 9))
+
+    def build(self, **kwargs):
+        built, errors = build_scss(get_scss_builds([(self.source_path, self.dest_path)]), **kwargs)
+        self.assertEqual(errors, {})
+        return sorted(os.path.relpath(path, self.dest_path) for path in built)
+
+    def read_output(self, file_name):
+        with open(os.path.join(self.dest_path, file_name)) as f:
+            return f.read()
+
+    def test_unchanged_sources_are_not_rebuilt(self):
+        self.assertEqual(self.build(), ['app.css', 'print.css'])
+        self.assertEqual(self.build(), [])
+        self.assertEqual(self.build(force=True), ['app.css', 'print.css'])
+
+    def test_changed_import_rebuilds_importing_entry_points(self):
+        self.build()
+        self.write_source('_colours.scss', '$text-colour: #d4351c;')
+        self.assertEqual(self.build(), ['app.css'])
+        self.assertIn('#d4351c', self.read_output('app.css'))
+
+    def test_touched_but_unchanged_source_is_not_rebuilt(self):
+        self.build()
+        self.write_source('print.scss', 'body { background: #fff; }')
+        self.assertEqual(self.build(), [])
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.dest_path, 'print.css'))
+        self.assertEqual(self.build(), ['print.css'])
+
+    def test_removed_entry_point_is_forgotten(self):
+        self.build()
+        os.remove(os.path.join(self.source_path, 'print.scss'))
+        self.assertEqual(self.build(), [])
+        self.write_source('print.scss', 'body { background: #fff; }')
+        self.assertEqual(self.build(), ['print.css'])
+
+    def test_manifest_kept_out_of_static_directories(self):
+        self.build()
+        self.assertEqual(sorted(os.listdir(self.dest_path)), ['app.css', 'print.css'])
+        self.assertEqual(len(os.listdir(self.cache_path)), 1)
+        self.assertIn(os.path.join(self.source_path, '_colours.scss'), get_dependencies(self.dest_path))
+
+    def test_missing_import_rebuilt_once_created(self):
+        self.write_source('app.scss', '@import "colours";\n@import "later";\nbody { color: $text-colour; }')
+        built, errors = build_scss(get_scss_builds([(self.source_path, self.dest_path)]))
+        self.assertIn(os.path.join(self.source_path, 'app.scss'), errors)
+        self.write_source('_later.scss', 'p { margin: 0; }')
+        self.assertEqual(self.build(), ['app.css'])
+
+    def test_parallel_build_matches_sequential_build(self):
+        self.assertEqual(self.build(), ['app.css', 'print.css'])
+        sequential_output = {file_name: self.read_output(file_name) for file_name in ('app.css', 'print.css')}
+        self.assertEqual(self.build(force=True, jobs=2), ['app.css', 'print.css'])
+        for file_name, output in sequential_output.items():
+            self.assertEqual(self.read_output(file_name), output)
+        self.assertEqual(self.build(jobs=2), [])
+
+    def test_parallel_build_reports_errors(self):
+        self.write_source('print.scss', 'body { color: $undefined-colour; }')
+        built, errors = build_scss(get_scss_builds([(self.source_path, self.dest_path)]), jobs=2)
+        self.assertEqual(built, [os.path.join(self.dest_path, 'app.css')])
+        self.assertEqual(list(errors), [os.path.join(self.source_path, 'print.scss')])
+        self.assertIn('Undefined variable', errors[os.path.join(self.source_path, 'print.scss')])
+
+    def test_profile_attributes_output_to_sources(self):
+        scss_builds = get_scss_builds([(self.source_path, self.dest_path)])
+        built, errors = build_scss(scss_builds, profile=True)
+        self.assertEqual(len(built), 2)
+        profile = scss_builds[0].profiles[os.path.join(self.source_path, 'app.scss')]
+        self.assertEqual(profile['imports'], 1)
+        self.assertEqual(profile['output_size'], len(self.read_output('app.css')))
+        # values of variables are attributed to the file defining them
+        self.assertEqual(sorted(profile['source_sizes']), [
+            os.path.join(self.source_path, '_colours.scss'), os.path.join(self.source_path, 'app.scss'),
+        ])
+        self.assertLessEqual(sum(profile['source_sizes'].values()), profile['output_size'])
+        # profiling always compiles
+        self.assertEqual(len(build_scss(get_scss_builds([(self.source_path, self.dest_path)]), profile=True)[0]), 2)
+
+
+class SourceMapTestCase(SimpleTestCase):
+    def test_decode_vlq(self):
+        self.assertEqual(decode_vlq('AAAA'), [0, 0, 0, 0])
+        self.assertEqual(decode_vlq('CDEF'), [1, -1, 2, -2])
+        self.assertEqual(decode_vlq('gB'), [16])
+        self.assertEqual(decode_vlq('hB'), [-16])
+        self.assertEqual(decode_vlq('2Hw+B'), [123, 1000])
+
+    def test_source_sizes(self):
+        root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root_path)
+        open(os.path.join(root_path, 'app.scss'), 'w').close()
+        source_map = json.dumps({
+            'version': 3,
+            'sources': ['app.scss', './govuk_template_base/defaults'],
+            'mappings': 'AAAA;ACAA,EDAA,C;',
+        })
+        self.assertEqual(get_source_sizes('a{b:c}\nd{e:fé}\n', source_map, os.path.join(root_path, 'app.css.map')), {
+            os.path.join(root_path, 'app.scss'): 12,
+            'importer:govuk_template_base/defaults': 2,
+        })
+
+
+@unittest.skipUnless(sass, 'libsass is not installed')
+class StaticFilesManifestTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root_path)
+        self.source_path = os.path.join(root_path, 'static-src', 'stylesheets')
+        self.static_root = os.path.join(root_path, 'static')
+        os.makedirs(self.source_path)
+        settings_override = override_settings(GOVUK_BUILDSCSS_CACHE_DIR=os.path.join(root_path, 'cache'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = ManifestStaticFilesStorage(location=self.static_root, base_url='/static/')
+        self.write_source('body { color: #0b0c0c; }')
+
+    def write_source(self, content, file_name='app.scss'):
+        with open(os.path.join(self.source_path, file_name), 'w') as f:
+            f.write(content)
+
+    def build(self, force=False):
+        scss_builds = get_scss_builds([(self.source_path, os.path.join(self.static_root, 'stylesheets'))])
+        built, errors = build_scss(scss_builds, force=force)
+        self.assertEqual(errors, {})
+        return update_staticfiles_manifest(scss_builds, built, self.storage)
+
+    def load_manifest(self):
+        hashed_files = ManifestStaticFilesStorage(location=self.static_root).load_manifest()
+        return hashed_files[0] if isinstance(hashed_files, tuple) else hashed_files
+
+    def test_manifest_storage(self):
+        self.assertIsNone(get_manifest_storage())
+
+    def test_hashed_copies_saved(self):
+        hashed_names = self.build()
+        self.assertEqual(len(hashed_names), 1)
+        hashed_name = hashed_names[0]
+        self.assertRegex(hashed_name, r'^stylesheets/app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(self.storage.exists(hashed_name))
+        self.assertEqual(self.load_manifest(), {'stylesheets/app.css': hashed_name})
+        self.assertEqual(self.storage.url('stylesheets/app.css'), '/static/' + hashed_name)
+
+    def test_unchanged_css_not_hashed_again(self):
+        first_hashed_name = self.build()[0]
+        self.assertEqual(self.build(), [])
+        self.write_source('body { color: #d4351c; }')
+        hashed_names = self.build()
+        self.assertEqual(len(hashed_names), 1)
+        self.assertNotEqual(hashed_names[0], first_hashed_name)
+        self.assertEqual(self.load_manifest(), {'stylesheets/app.css': hashed_names[0]})
+
+    def test_css_missing_from_manifest_hashed(self):
+        self.build()
+        self.write_source('body { background: #fff; }', file_name='print.scss')
+        os.remove(os.path.join(self.static_root, 'staticfiles.json'))
+        self.assertEqual(sorted(self.build()), sorted(self.load_manifest().values()))
+        self.assertEqual(sorted(self.load_manifest()), ['stylesheets/app.css', 'stylesheets/print.css'])
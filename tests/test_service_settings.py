@@ -0,0 +1,248 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import NoReverseMatch, set_script_prefix
+
+from govuk_template_base.models import Link, ServiceSettings
+from govuk_template_base.service_settings import (
+    ServiceSettingsCache, compile_link, compile_settings, default_settings, request_settings, reverse_cache,
+    service_settings_cache, shared_service_settings_cache, static_service_settings,
+)
+
+
+class ServiceSettingsTestCase(TransactionTestCase):
+    # settings caches are cleared once transactions commit so each test needs to commit its changes
+
+    def setUp(self):
+        super().setUp()
+        service_settings_cache.clear()
+        self.addCleanup(service_settings_cache.clear)
+
+    def get_default(self):
+        return ServiceSettings.objects.get(host=ServiceSettings.default_host)
+
+
+class ServiceSettingsCacheTestCase(ServiceSettingsTestCase):
+    def test_cache_cleared_when_settings_saved(self):
+        service_settings = self.get_default()
+        self.assertEqual(default_settings().name, 'Untitled service')
+        service_settings.name = 'Renamed service'
+        service_settings.save()
+        self.assertEqual(default_settings().name, 'Renamed service')
+
+    def test_cache_cleared_when_settings_deleted(self):
+        service_settings = self.get_default()
+        service_settings.name = 'Renamed service'
+        service_settings.save()
+        self.assertEqual(default_settings().name, 'Renamed service')
+        service_settings.delete()
+        self.assertEqual(default_settings().name, 'Untitled service')
+
+    def test_cache_cleared_when_links_change(self):
+        service_settings = self.get_default()
+        link = Link.objects.create(name='Help', link='https://example.com/help')
+        self.assertFalse(default_settings().has_footer_links)
+        service_settings.footer_links.add(link)
+        self.assertEqual([str(link) for link in default_settings().get_footer_links()], ['Help'])
+
+        link.name = 'Support'
+        link.save()
+        self.assertEqual([str(link) for link in default_settings().get_footer_links()], ['Support'])
+
+        link.delete()
+        self.assertFalse(default_settings().has_footer_links)
+
+    def test_cache_kept_until_changes_are_committed(self):
+        service_settings = self.get_default()
+        self.assertEqual(default_settings().name, 'Untitled service')
+        with transaction.atomic():
+            service_settings.name = 'Renamed service'
+            service_settings.save()
+            self.assertEqual(default_settings().name, 'Untitled service')
+        self.assertEqual(default_settings().name, 'Renamed service')
+
+    def test_cached_settings_are_immutable(self):
+        service_settings = default_settings()
+        with self.assertRaises(AttributeError):
+            service_settings.name = 'Renamed service'
+        self.assertEqual(default_settings().name, 'Untitled service')
+
+    def test_unused_link_does_not_touch_settings(self):
+        modified = self.get_default().modified
+        link = Link.objects.create(name='Help', link='https://example.com/help')
+        link.name = 'Support'
+        link.save()
+        link.delete()
+        self.assertEqual(self.get_default().modified, modified)
+
+    def test_used_link_touches_settings(self):
+        service_settings = self.get_default()
+        link = Link.objects.create(name='Help', link='https://example.com/help')
+        service_settings.header_links.add(link)
+        modified = self.get_default().modified
+        link.save()
+        self.assertGreater(self.get_default().modified, modified)
+
+
+class DefaultServiceSettingsTestCase(ServiceSettingsTestCase):
+    def test_default_settings_created_after_migrating(self):
+        self.assertEqual(ServiceSettings.objects.filter(host=ServiceSettings.default_host).count(), 1)
+
+    def test_missing_default_settings(self):
+        ServiceSettings.objects.all().delete()
+        service_settings = default_settings()
+        self.assertEqual(service_settings.name, 'Untitled service')
+        self.assertFalse(service_settings.has_header_links)
+        self.assertEqual(list(service_settings.get_footer_links()), [])
+
+
+class StaticServiceSettingsTestCase(SimpleTestCase):
+    def test_settings_compiled(self):
+        service_settings = compile_settings({
+            'name': 'Static service',
+            'phase': 'beta',
+            'header_links': [{'name': 'GOV.UK', 'link': 'https://www.gov.uk/'}],
+        })
+        self.assertEqual(service_settings.name, 'Static service')
+        self.assertEqual(str(service_settings.phase_name), 'Beta')
+        self.assertTrue(service_settings.has_header_links)
+        self.assertFalse(service_settings.has_footer_links)
+        self.assertEqual(service_settings.header_links[0].url, 'https://www.gov.uk/')
+        with self.assertRaises(AttributeError):
+            service_settings.name = 'Renamed service'
+        with self.assertRaises(AttributeError):
+            service_settings.header_links[0].link = 'https://example.com/'
+
+    def test_unknown_keys(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'Unknown GOVUK_SERVICE_SETTINGS keys: colour'):
+            compile_settings({'name': 'Static service', 'colour': 'blue'})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'Unknown GOVUK_SERVICE_SETTINGS link keys: url'):
+            compile_settings({'footer_links': [{'name': 'GOV.UK', 'url': 'https://www.gov.uk/'}]})
+
+    def test_unknown_phase(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'Unknown GOVUK_SERVICE_SETTINGS phase “gamma”'):
+            compile_settings({'phase': 'gamma'})
+
+    def test_settings_recompiled_when_changed(self):
+        with override_settings(GOVUK_SERVICE_SETTINGS={'name': 'Static service'}):
+            self.assertEqual(default_settings('one.example.com').name, 'Static service')
+            with self.assertRaises(ImproperlyConfigured):
+                with override_settings(GOVUK_SERVICE_SETTINGS={'phase': 'gamma'}):
+                    pass
+        self.assertIsNone(static_service_settings.service_settings)
+
+
+class ReverseCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        reverse_cache.clear()
+        self.addCleanup(reverse_cache.clear)
+
+    def test_link_urls_reversed(self):
+        link = compile_link({'name': 'Page', 'link': 'page', 'link_is_view_name': True})
+        self.assertEqual(link.url, '/page/')
+        self.assertEqual(link.url, '/page/')
+        with self.assertRaises(NoReverseMatch):
+            compile_link({'name': 'Missing', 'link': 'missing', 'link_is_view_name': True}).url
+
+    def test_cache_cleared_when_urlconf_changes(self):
+        self.assertEqual(reverse_cache.reverse('page'), '/page/')
+        with override_settings(ROOT_URLCONF='tests.other_urls'):
+            self.assertEqual(reverse_cache.reverse('page'), '/other/page/')
+        self.assertEqual(reverse_cache.reverse('page'), '/page/')
+
+    def test_cache_varies_by_script_prefix(self):
+        self.assertEqual(reverse_cache.reverse('page'), '/page/')
+        set_script_prefix('/prefix/')
+        try:
+            self.assertEqual(reverse_cache.reverse('page'), '/prefix/page/')
+        finally:
+            set_script_prefix('/')
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+    },
+    GOVUK_SERVICE_SETTINGS_CACHE='shared',
+)
+class SharedServiceSettingsCacheTestCase(ServiceSettingsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(shared_service_settings_cache.cache.clear)
+        # stands in for a cache in another process which is not cleared by model signals
+        self.other_process_cache = ServiceSettingsCache()
+        self.other_process_cache.configure()
+
+    def rename_without_signals(self, name):
+        ServiceSettings.objects.filter(host=ServiceSettings.default_host).update(name=name)
+
+    def test_version_bump_seen_by_other_processes(self):
+        self.assertEqual(self.other_process_cache.get().name, 'Untitled service')
+        service_settings = self.get_default()
+        service_settings.name = 'Renamed service'
+        service_settings.save()
+        self.assertEqual(self.other_process_cache.get().name, 'Renamed service')
+
+    def test_stale_snapshot_served_while_another_process_rebuilds(self):
+        cache = shared_service_settings_cache.cache
+        self.assertEqual(self.other_process_cache.get().name, 'Untitled service')
+        self.rename_without_signals('Renamed service')
+        shared_service_settings_cache.bump_version()
+        cache.add(shared_service_settings_cache.lock_key, True)
+        self.assertEqual(self.other_process_cache.get().name, 'Untitled service')
+        self.assertEqual(self.other_process_cache.get().name, 'Untitled service')
+        cache.delete(shared_service_settings_cache.lock_key)
+        self.assertEqual(self.other_process_cache.get().name, 'Renamed service')
+
+    def test_database_used_while_another_process_rebuilds_missing_snapshot(self):
+        cache = shared_service_settings_cache.cache
+        self.rename_without_signals('Renamed service')
+        cache.add(shared_service_settings_cache.lock_key, True)
+        self.assertEqual(self.other_process_cache.get().name, 'Renamed service')
+        self.assertIsNone(cache.get(shared_service_settings_cache.snapshot_key))
+
+    @override_settings(GOVUK_SERVICE_SETTINGS_CACHE_TTL=0)
+    def test_snapshot_rebuilt_once_expired(self):
+        self.other_process_cache.configure()
+        self.assertEqual(self.other_process_cache.get().name, 'Untitled service')
+        self.rename_without_signals('Renamed service')
+        self.assertEqual(self.other_process_cache.get().name, 'Renamed service')
+
+    def test_settings_read_when_changed(self):
+        self.assertEqual(shared_service_settings_cache.alias, 'shared')
+        with override_settings(GOVUK_SERVICE_SETTINGS_CACHE_TTL=5):
+            self.assertEqual(shared_service_settings_cache.ttl, 5)
+            self.assertEqual(service_settings_cache.ttl, 5)
+        self.assertEqual(shared_service_settings_cache.ttl, 60)
+
+
+class HostServiceSettingsTestCase(ServiceSettingsTestCase):
+    def test_settings_selected_by_host(self):
+        ServiceSettings.objects.create(host='one.example.com', name='Service one')
+        ServiceSettings.objects.create(host='two.example.com', name='Service two')
+        self.assertEqual(default_settings('one.example.com').name, 'Service one')
+        self.assertEqual(default_settings('two.example.com').name, 'Service two')
+        self.assertEqual(default_settings('other.example.com').name, 'Untitled service')
+        self.assertEqual(default_settings().name, 'Untitled service')
+
+    def test_default_settings_used_once_host_settings_deleted(self):
+        service_settings = ServiceSettings.objects.create(host='one.example.com', name='Service one')
+        self.assertEqual(default_settings('one.example.com').name, 'Service one')
+        service_settings.delete()
+        self.assertEqual(default_settings('one.example.com').name, 'Untitled service')
+
+    @override_settings(ALLOWED_HOSTS=['one.example.com'])
+    def test_settings_selected_by_request_host(self):
+        ServiceSettings.objects.create(host='one.example.com', name='Service one')
+        request = RequestFactory().get('/', HTTP_HOST='one.example.com:8000')
+        self.assertEqual(request_settings(request).name, 'Service one')
+        self.assertIs(request_settings(request), request_settings(request))
+        request = RequestFactory().get('/', HTTP_HOST='disallowed.example.com')
+        self.assertEqual(request_settings(request).name, 'Untitled service')
+
+    def test_host_stored_in_lower_case(self):
+        service_settings = ServiceSettings(host='One.Example.com', name='Service one')
+        service_settings.full_clean()
+        self.assertEqual(service_settings.host, 'one.example.com')
@@ -0,0 +1,74 @@
+import types
+
+from django.template import Context, Engine
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import translation
+
+from govuk_template_base.templatetags.govuk_template_base import fragment_cache, page_list_without_count_context
+
+header_template = (
+    '{% load govuk_template_base %}'
+    '{% govuk_header %}{{ value }} {{ request.resolver_match.view_name }}{% endgovuk_header %}'
+)
+
+
+@override_settings(GOVUK_SERVICE_SETTINGS={
+    'name': 'Static service',
+    'header_links': [{'name': 'Page', 'link': 'page', 'link_is_view_name': True}],
+})
+class FragmentCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        fragment_cache.version = None
+        self.addCleanup(setattr, fragment_cache, 'version', None)
+        self.engine = Engine(
+            loaders=[('django.template.loaders.locmem.Loader', {'header.html': header_template})],
+            libraries={'govuk_template_base': 'govuk_template_base.templatetags.govuk_template_base'},
+        )
+
+    def render(self, value, view_name=None):
+        request = RequestFactory().get('/')
+        request.resolver_match = view_name and types.SimpleNamespace(view_name=view_name)
+        return self.engine.get_template('header.html').render(Context({'value': value, 'request': request}))
+
+    def test_not_cached_by_default(self):
+        self.assertEqual(self.render(1), '1 ')
+        self.assertEqual(self.render(2), '2 ')
+
+    @override_settings(GOVUK_CACHE_TEMPLATE_FRAGMENTS=True)
+    def test_cached_when_enabled(self):
+        self.assertEqual(self.render(1), '1 ')
+        self.assertEqual(self.render(2), '1 ')
+
+    @override_settings(GOVUK_CACHE_TEMPLATE_FRAGMENTS=True)
+    def test_varies_by_language(self):
+        self.assertEqual(self.render(1), '1 ')
+        with translation.override('cy'):
+            self.assertEqual(self.render(2), '2 ')
+            self.assertEqual(self.render(3), '2 ')
+
+    @override_settings(GOVUK_CACHE_TEMPLATE_FRAGMENTS=True)
+    def test_varies_by_active_header_link(self):
+        self.assertEqual(self.render(1), '1 ')
+        self.assertEqual(self.render(2, 'page'), '2 page')
+        self.assertEqual(self.render(3, 'page'), '2 page')
+        # views without header links share the fragment rendered without an active link
+        self.assertEqual(self.render(4, 'other'), '1 ')
+
+    @override_settings(GOVUK_CACHE_TEMPLATE_FRAGMENTS=True)
+    def test_cleared_when_service_settings_change(self):
+        self.assertEqual(self.render(1), '1 ')
+        with override_settings(GOVUK_SERVICE_SETTINGS={'name': 'Other service'}):
+            self.assertEqual(self.render(2), '2 ')
+
+
+class PageListTestCase(SimpleTestCase):
+    def test_page_list_without_count(self):
+        context = page_list_without_count_context(5, True)
+        self.assertEqual(context['page_range'], [1, 2, 3, 4, 5, 6, None])
+        context = page_list_without_count_context(10, False, approximate_page_count=8)
+        self.assertEqual(context['page_range'], [1, 2, None, 8, 9, 10])
+        self.assertIsNone(context['approximate_page_count'])
+        context = page_list_without_count_context(1, True, approximate_page_count=1000)
+        self.assertEqual(context['page_range'], [1, 2, None])
+        self.assertEqual(context['approximate_page_count'], 1000)
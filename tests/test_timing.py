@@ -0,0 +1,73 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from govuk_template_base.middleware import ServerTimingMiddleware
+from govuk_template_base.models import Link
+from govuk_template_base.timing import Timings, timed, timing_recorder
+
+recorded_timings = []
+
+
+def record_timings(request, response, timings):
+    recorded_timings.append(timings)
+
+
+@timed('govuk-test')
+def count_links():
+    return Link.objects.count()
+
+
+@timed('govuk-test')
+def nested(depth):
+    return nested(depth - 1) if depth else 0
+
+
+def view(request):
+    count_links()
+    response = HttpResponse()
+    response['Server-Timing'] = 'app;dur=1'
+    return response
+
+
+class ServerTimingMiddlewareTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        recorded_timings.clear()
+
+    def get_response(self):
+        return ServerTimingMiddleware(view)(RequestFactory().get('/'))
+
+    def test_header_added(self):
+        response = self.get_response()
+        metrics = response['Server-Timing'].split(', ')
+        self.assertEqual(metrics[0], 'app;dur=1')
+        self.assertRegex(metrics[1], r'^total;dur=\d+\.\d{3};desc="1 query"$')
+        self.assertRegex(metrics[2], r'^govuk-test;dur=\d+\.\d{3};desc="1 query"$')
+        self.assertIsNone(timing_recorder.timings)
+
+    @override_settings(GOVUK_SERVER_TIMING_HEADER=False, GOVUK_TIMING_CALLBACK='tests.test_timing.record_timings')
+    def test_callback(self):
+        response = self.get_response()
+        self.assertEqual(response['Server-Timing'], 'app;dur=1')
+        self.assertEqual(len(recorded_timings), 1)
+        timings = recorded_timings[0]
+        self.assertEqual(timings.queries, 1)
+        self.assertEqual(list(timings.stages), ['total', 'govuk-test'])
+        self.assertEqual(timings.stages['govuk-test'].calls, 1)
+        self.assertGreater(timings.stages['total'].duration, 0)
+
+    def test_not_recorded_outside_requests(self):
+        self.assertIsNone(timing_recorder.timings)
+        self.assertEqual(nested(2), 0)
+
+    def test_reentered_stages_counted_once(self):
+        timings = timing_recorder.start()
+        try:
+            nested(2)
+        finally:
+            timing_recorder.stop()
+        self.assertIsInstance(timings, Timings)
+        stage = timings.stages['govuk-test']
+        self.assertEqual(stage.calls, 3)
+        self.assertEqual(stage.depth, 0)
+        self.assertGreater(stage.duration, 0)
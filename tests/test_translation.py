@@ -0,0 +1,60 @@
+import pathlib
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import translation
+from django.utils.autoreload import file_changed
+
+from govuk_template_base.context_processors import govuk_template_base
+from govuk_template_base.translation import string_tables
+
+
+class StringTablesTestCase(SimpleTestCase):
+    # compiled message catalogues may not be present so tables record the active language instead
+
+    def setUp(self):
+        super().setUp()
+        string_tables.clear()
+        self.addCleanup(string_tables.clear)
+        self.calls = 0
+
+    def factory(self):
+        self.calls += 1
+        return {'language': translation.get_language()}
+
+    def test_tables_built_once_per_language(self):
+        self.assertEqual(string_tables.get('test', self.factory), {'language': 'en-gb'})
+        self.assertEqual(string_tables.get('test', self.factory), {'language': 'en-gb'})
+        with translation.override('cy'):
+            self.assertEqual(string_tables.get('test', self.factory), {'language': 'cy'})
+        self.assertEqual(self.calls, 2)
+
+    def test_gettext_memoised(self):
+        self.assertEqual(string_tables.gettext('Page'), translation.gettext('Page'))
+        self.assertIn('Page', string_tables.get('gettext', dict))
+        with translation.override('cy'):
+            self.assertNotIn('Page', string_tables.get('gettext', dict))
+
+    def test_tables_cleared_when_settings_change(self):
+        string_tables.get('test', self.factory)
+        with override_settings(LOCALE_PATHS=[]):
+            string_tables.get('test', self.factory)
+        self.assertEqual(self.calls, 2)
+
+    def test_tables_cleared_when_catalogues_change(self):
+        string_tables.get('test', self.factory)
+        file_changed.send(sender=None, file_path=pathlib.Path('locale/cy/LC_MESSAGES/django.po'))
+        string_tables.get('test', self.factory)
+        self.assertEqual(self.calls, 1)
+        file_changed.send(sender=None, file_path=pathlib.Path('locale/cy/LC_MESSAGES/django.mo'))
+        string_tables.get('test', self.factory)
+        self.assertEqual(self.calls, 2)
+
+    def test_context_processor_messages(self):
+        request = RequestFactory().get('/')
+        with translation.override('cy'):
+            context = govuk_template_base(request)
+        self.assertEqual(context['html_lang'], 'cy')
+        self.assertIn(('cy', 'template_messages'), string_tables.tables)
+        context = govuk_template_base(request)
+        self.assertEqual(context['html_lang'], 'en-gb')
+        self.assertEqual(context['skip_link_message'], 'Skip to main content')
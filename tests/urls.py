@@ -0,0 +1,11 @@
+from django.http import HttpResponse
+from django.urls import path
+
+
+def view(request):
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('page/', view, name='page'),
+]